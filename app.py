@@ -1,86 +1,335 @@
-from flask import Flask, render_template, request, redirect, url_for, flash
+from flask import Flask, Response, current_app, render_template, request, redirect, url_for, flash, abort, jsonify
+from flask import stream_template
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event, func, select, text
+from sqlalchemy.orm import defer
 from datetime import datetime, timezone
+from itertools import chain
+from types import SimpleNamespace
+from jinja2 import FileSystemBytecodeCache
 import os
-import secrets
 
-app = Flask(__name__)
-app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', secrets.token_hex(32))
-# Handle Railway PostgreSQL URL format
-database_url = os.environ.get('DATABASE_URL', 'sqlite:///portfolio.db')
-if database_url and database_url.startswith('postgres://'):
-    database_url = database_url.replace('postgres://', 'postgresql://', 1)
-app.config['SQLALCHEMY_DATABASE_URI'] = database_url
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-app.config['SERVER_NAME'] = os.environ.get('SERVER_NAME', None)
-app.config['PREFERRED_URL_SCHEME'] = os.environ.get('PREFERRED_URL_SCHEME', 'https')
+from config import config, config_name
+from pagination import paginate_posts, InvalidCursor
+from page_cache import PageCache
+from conditional import conditional, template_version
+from assets import Assets
+from compression import Compressor
+from metrics import Metrics
+from object_cache import ObjectCache
+from freeze import Freezer
+from health import Health
+from errors import ErrorPages
+from replicas import Replicas, RoutingSession
+from feeds import Feeds
+from jobs import Jobs, ensure_job_table
+from fragments import FragmentCache
+from search import ensure_search_index, index_post, search_posts
+from rendering import plain_text, render_fields
+from engine_profiles import apply_engine_profile, engine_options
 
-db = SQLAlchemy(app)
+db = SQLAlchemy(session_options={'class_': RoutingSession})
+page_cache = PageCache()
+assets = Assets()
+compressor = Compressor()
+metrics = Metrics()
+object_cache = ObjectCache()
+freezer = Freezer()
+health = Health()
+error_pages = ErrorPages()
+replicas = Replicas()
+feeds = Feeds()
+jobs = Jobs()
+fragment_cache = FragmentCache()
+
+# Views and error handlers are collected here and registered by create_app()
+routes = []
+error_handlers = []
+# The app create_app() built; the extensions above keep its settings
+built_apps = []
+
+def route(rule, **options):
+    """Like ``app.route``, for views registered on the app create_app() builds"""
+    def decorator(view):
+        routes.append((rule, view, options))
+        return view
+    return decorator
+
+def errorhandler(code):
+    def decorator(handler):
+        error_handlers.append((code, handler))
+        return handler
+    return decorator
 
 # Security headers
-@app.after_request
 def after_request(response):
     response.headers['X-Content-Type-Options'] = 'nosniff'
     response.headers['X-Frame-Options'] = 'DENY'
     response.headers['X-XSS-Protection'] = '1; mode=block'
     return response
 
+# Streamed pages read rows in batches of STREAM_YIELD_PER and send the
+# HTML in chunks of about STREAM_CHUNK_SIZE characters
+STREAM_YIELD_PER = 500
+STREAM_CHUNK_SIZE = 16384
+
+def stream_page(template_name, **context):
+    """A response that renders ``template_name`` while it is being sent"""
+    return Response(_buffered(stream_template(template_name, **context)), mimetype='text/html')
+
+def _buffered(chunks, size=STREAM_CHUNK_SIZE):
+    # Jinja yields a string per template node; one write per node is too many
+    try:
+        buffer, length = [], 0
+        for chunk in chunks:
+            buffer.append(chunk)
+            length += len(chunk)
+            if length >= size:
+                yield ''.join(buffer)
+                buffer, length = [], 0
+        if buffer:
+            yield ''.join(buffer)
+    finally:
+        # Ends the request context stream_template keeps open
+        chunks.close()
+
 # Blog Post Model
+EXCERPT_LENGTH = 200
+WORDS_PER_MINUTE = 200
+
 class BlogPost(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(200), nullable=False)
     content = db.Column(db.Text, nullable=False)
     date_posted = db.Column(db.DateTime, nullable=False, default=lambda: datetime.now(timezone.utc))
+    # Bumped whenever the title or content changes; drives ETag/Last-Modified
+    date_updated = db.Column(db.DateTime, index=True)
+
+    # Derived from content when the post is saved so listings never load it
+    excerpt = db.Column(db.String(EXCERPT_LENGTH + 3))
+    word_count = db.Column(db.Integer)
+    reading_time = db.Column(db.Integer)
+
+    # Markdown rendered to sanitized HTML when the post is saved
+    content_html = db.Column(db.Text)
+    toc_html = db.Column(db.Text)
+    render_version = db.Column(db.Integer)
+
+    # Listing pages sort and paginate on (date_posted, id)
+    __table_args__ = (
+        db.Index('ix_blog_post_date_posted_id', 'date_posted', 'id'),
+    )
     
     def __repr__(self):
         return f"BlogPost('{self.title}', '{self.date_posted}')"
 
-# Error handlers
-@app.errorhandler(404)
+    def update_summary(self):
+        """Recompute the stored excerpt, word count and reading time"""
+        for field, value in summarize_content(self.content).items():
+            setattr(self, field, value)
+
+    def render(self):
+        """Re-render the stored HTML and table of contents from content"""
+        for field, value in render_fields(self.content).items():
+            setattr(self, field, value)
+
+def summarize_content(content):
+    """Return the listing fields derived from a post body"""
+    content = plain_text(content)
+    words = len(content.split())
+    excerpt = content[:EXCERPT_LENGTH]
+    if len(content) > EXCERPT_LENGTH:
+        excerpt += '...'
+    return {
+        'excerpt': excerpt,
+        'word_count': words,
+        'reading_time': int(words / WORDS_PER_MINUTE + 0.5),
+    }
+
+@event.listens_for(BlogPost, 'before_insert')
+def _summarize_new_post(mapper, connection, post):
+    # Listings need the excerpt at once; the HTML is rendered by the
+    # render_post job, and the article falls back to plain text until then
+    post.update_summary()
+    if post.date_posted is None:
+        post.date_posted = datetime.now(timezone.utc)
+    post.date_updated = post.date_posted
+
+@event.listens_for(BlogPost, 'before_update')
+def _summarize_changed_post(mapper, connection, post):
+    attrs = db.inspect(post).attrs
+    if attrs.content.history.has_changes():
+        post.update_summary()
+        post.render()
+    if attrs.content.history.has_changes() or attrs.title.history.has_changes():
+        post.date_updated = datetime.now(timezone.utc)
+
+def newest_post_validators(**view_args):
+    """Validators for listings: newest modification time plus the highest id"""
+    try:
+        # Separate subqueries so each MAX() is answered from an index
+        last_modified, newest_id = db.session.execute(select(
+            select(func.max(BlogPost.date_updated)).scalar_subquery(),
+            select(func.max(BlogPost.id)).scalar_subquery(),
+        )).one()
+    except Exception as e:
+        # Let the view render its "unable to load posts" fallback
+        db.session.rollback()
+        return None
+    return (last_modified, newest_id), last_modified
+
+def _post_key(post_id):
+    return f'post:{post_id}'
+
+def _load_post_row(post_id):
+    row = db.session.execute(
+        select(BlogPost.__table__).where(BlogPost.id == post_id)).mappings().one_or_none()
+    return dict(row) if row is not None else None
+
+def cached_post(post_id):
+    """A post's column values as attributes, read through the object cache"""
+    row = object_cache.get_or_load(_post_key(post_id), lambda: _load_post_row(post_id))
+    return SimpleNamespace(**row) if row is not None else None
+
+@event.listens_for(db.session, 'after_flush')
+def _track_changed_posts(session, flush_context):
+    changed = session.info.setdefault('changed_posts', set())
+    for obj in chain(session.new, session.dirty, session.deleted):
+        if isinstance(obj, BlogPost):
+            changed.add(obj.id)
+
+@event.listens_for(db.session, 'after_commit')
+def _invalidate_changed_posts(session):
+    # After the commit, so a concurrent reader cannot re-cache the old row
+    changed = session.info.pop('changed_posts', None)
+    if changed:
+        object_cache.delete(*(_post_key(post_id) for post_id in changed))
+        # Synchronously: the home page's validators are read live, so a cached
+        # body must not outlive the commit that changed them
+        page_cache.invalidate('home')
+
+@event.listens_for(db.session, 'after_rollback')
+def _forget_changed_posts(session):
+    session.info.pop('changed_posts', None)
+
+def post_validators(post_id):
+    """Validators for a single post, taken from the cached row"""
+    post = cached_post(post_id)
+    if post is None or post.date_updated is None:
+        return None
+    # A re-render changes the page without touching date_updated
+    return (post_id, post.date_updated, post.render_version), post.date_updated
+
+def listing_query():
+    """BlogPost query for list pages; loading ``content`` raises instead of lazy-loading"""
+    return BlogPost.query.options(defer(BlogPost.content, raiseload=True))
+
+# Error handlers; the pages are prerendered once per worker (see errors.py).
+# The session is rolled back when the app context is torn down.
+@errorhandler(404)
 def not_found_error(error):
-    return render_template('index.html', posts=[]), 404
+    return error_pages.response(404)
 
-@app.errorhandler(500)
+@errorhandler(500)
 def internal_error(error):
-    db.session.rollback()
-    return render_template('index.html', posts=[]), 500
+    return error_pages.response(500)
 
 # Routes
-@app.route('/')
+@route('/')
+@replicas.read_only
+@conditional(newest_post_validators)
+@page_cache.cached
 def home():
     try:
-        posts = BlogPost.query.order_by(BlogPost.date_posted.desc()).limit(3).all()
+        posts = listing_query().order_by(BlogPost.date_posted.desc()).limit(3).all()
     except Exception as e:
         posts = []
         flash('Unable to load recent posts', 'warning')
     return render_template('index.html', posts=posts)
 
-@app.route('/old-home')
+@route('/old-home')
+@page_cache.cached
 def old_home():
     return render_template('home.html')
 
-@app.route('/about')
+@route('/about')
+@page_cache.cached
 def about():
     return render_template('about.html')
 
-@app.route('/experience')
+@route('/experience')
+@page_cache.cached
 def experience():
     return render_template('experience.html')
 
-@app.route('/projects')
+@route('/projects')
+@page_cache.cached
 def projects():
     return render_template('projects.html')
 
-@app.route('/blog')
+def _blog_page():
+    """Fetch the page of posts selected by the ``after``/``before`` cursors"""
+    return paginate_posts(
+        listing_query(), BlogPost, current_app.config['POSTS_PER_PAGE'],
+        after=request.args.get('after'), before=request.args.get('before'))
+
+@route('/blog')
+@replicas.read_only
+@conditional(newest_post_validators)
 def blog():
     try:
-        posts = BlogPost.query.order_by(BlogPost.date_posted.desc()).all()
+        page = _blog_page()
+    except InvalidCursor:
+        abort(400)
     except Exception as e:
-        posts = []
+        page = None
         flash('Unable to load blog posts', 'warning')
-    return render_template('blog.html', posts=posts)
+    return render_template('blog.html', posts=page.items if page else [], page=page)
 
-@app.route('/blog/new', methods=['GET', 'POST'])
+@route('/blog/archive')
+@conditional(newest_post_validators)
+def blog_archive():
+    """Every post, streamed: memory stays flat however large the archive"""
+    posts = db.session.execute(
+        select(BlogPost.id, BlogPost.title, BlogPost.date_posted, BlogPost.excerpt)
+        .order_by(BlogPost.date_posted.desc(), BlogPost.id.desc())
+        .execution_options(yield_per=STREAM_YIELD_PER))
+    return stream_page('archive.html', posts=posts)
+
+@route('/api/posts')
+@replicas.read_only
+@conditional(newest_post_validators)
+def blog_json():
+    """JSON variant of /blog using the same cursors"""
+    try:
+        page = _blog_page()
+    except InvalidCursor:
+        abort(400)
+    return jsonify({
+        'posts': [{
+            'id': post.id,
+            'title': post.title,
+            'date_posted': post.date_posted.isoformat(),
+            'excerpt': post.excerpt,
+            'reading_time': post.reading_time,
+            'url': url_for('blog_post', post_id=post.id),
+        } for post in page.items],
+        'next': url_for('blog_json', after=page.next_cursor) if page.has_next else None,
+        'prev': url_for('blog_json', before=page.prev_cursor) if page.has_prev else None,
+    })
+
+@route('/blog/search')
+def blog_search():
+    query = request.args.get('q', '').strip()[:200]
+    try:
+        results = search_posts(db, query)
+    except Exception as e:
+        db.session.rollback()
+        results = []
+        flash('Search is temporarily unavailable', 'warning')
+    return render_template('search.html', query=query, results=results)
+
+@route('/blog/new', methods=['GET', 'POST'])
 def new_blog_post():
     if request.method == 'POST':
         title = request.form.get('title', '').strip()
@@ -90,6 +339,9 @@ def new_blog_post():
             try:
                 post = BlogPost(title=title, content=content)
                 db.session.add(post)
+                db.session.flush()
+                # Committed with the post; the rest of publishing runs in the background
+                enqueue_publish_jobs(post.id)
                 db.session.commit()
                 flash('Blog post created successfully!', 'success')
                 return redirect(url_for('blog'))
@@ -101,31 +353,211 @@ def new_blog_post():
     
     return render_template('new_post.html')
 
-@app.route('/blog/<int:post_id>')
+@route('/blog/<int:post_id>')
+@replicas.read_only
+@conditional(post_validators)
 def blog_post(post_id):
-    post = BlogPost.query.get_or_404(post_id)
-    return render_template('blog_post.html', post=post)
+    post = cached_post(post_id)
+    if post is None:
+        abort(404)
+    # The article markup only changes with the post, its renderer or a deploy
+    key = f'post-html:{post_id}:{post.date_updated}:{post.render_version}:{template_version()}'
+    article_html = object_cache.get_or_load(
+        key, lambda: render_template('post_article.html', post=post))
+    return render_template('blog_post.html', post=post, article_html=article_html)
 
-@app.route('/contact')
+@route('/contact')
+@page_cache.cached
 def contact():
     return render_template('contact.html')
 
-@app.route('/health')
+@route('/health')
 def health_check():
     """Health check endpoint for deployment platforms"""
     return {"status": "healthy", "message": "Portfolio website is running"}, 200
 
+# Readiness checks behind /readyz (see health.py)
+@health.check('database')
+def _database_ready():
+    with db.engine.connect() as connection:
+        connection.exec_driver_sql('SELECT 1')
+
+@health.check('templates')
+def _templates_ready():
+    # Served from Jinja's in-memory cache once the templates are loaded
+    for name in current_app.jinja_env.list_templates(extensions=['html']):
+        current_app.jinja_env.get_template(name)
+
+# Publishing pipeline, run by background jobs (see jobs.py)
+def enqueue_publish_jobs(post_id):
+    jobs.enqueue('render_post', post_id=post_id)
+    jobs.enqueue('index_post', post_id=post_id)
+
+@jobs.task('render_post')
+def _render_post_job(post_id):
+    post = db.session.get(BlogPost, post_id)
+    if post is None:
+        return
+    post.render()
+    # The feed and the static export carry the rendered HTML
+    jobs.enqueue('refresh_feeds', post_id=post_id)
+    jobs.enqueue('freeze_post', post_id=post_id)
+
+@jobs.task('index_post')
+def _index_post_job(post_id):
+    post = db.session.get(BlogPost, post_id)
+    if post is not None:
+        index_post(db, post)
+
+@jobs.task('invalidate_pages')
+def _invalidate_pages_job(post_id):
+    # No longer queued (see _invalidate_changed_posts); drains rows from older releases
+    page_cache.invalidate('home')
+
+@jobs.task('refresh_feeds')
+def _refresh_feeds_job(post_id):
+    # A /feed.xml request may already have merged the post in, before it was rendered
+    if not feeds.refresh_post(current_app._get_current_object(), post_id):
+        raise RuntimeError('the feed and sitemap could not be updated')
+
+@jobs.task('freeze_post')
+def _freeze_post_job(post_id):
+    # Runs here rather than on another thread, so the job is done only once the files are
+    freezer.rebuild(current_app._get_current_object(), post_id)
+
+# Data for /feed.xml and /sitemap.xml (see feeds.py)
+@feeds.loader('newest_id')
+def _newest_post_id():
+    return db.session.execute(select(func.max(BlogPost.id))).scalar()
+
+@feeds.loader('feed_posts')
+def _feed_posts(limit, after_id=0):
+    rows = db.session.execute(
+        select(BlogPost.id, BlogPost.title, BlogPost.excerpt, BlogPost.content_html,
+               BlogPost.date_posted, BlogPost.date_updated)
+        .where(BlogPost.id > after_id)
+        .order_by(BlogPost.date_posted.desc(), BlogPost.id.desc())
+        .limit(limit)).mappings()
+    return [dict(row) for row in rows]
+
+@feeds.loader('feed_post')
+def _feed_post(post_id):
+    row = db.session.execute(
+        select(BlogPost.id, BlogPost.title, BlogPost.excerpt, BlogPost.content_html,
+               BlogPost.date_posted, BlogPost.date_updated)
+        .where(BlogPost.id == post_id)).mappings().first()
+    return dict(row) if row is not None else None
+
+@feeds.loader('sitemap_posts')
+def _sitemap_posts(after_id=0):
+    # Streamed, so building the sitemap of a large archive stays flat in memory
+    return db.session.execute(
+        select(BlogPost.id, BlogPost.date_updated)
+        .where(BlogPost.id > after_id)
+        .order_by(BlogPost.id)
+        .execution_options(yield_per=1000))
+
+@route('/health/cache')
+def cache_stats():
+    """Hit/miss counters for this worker's page, fragment and object caches"""
+    return {"page_cache": page_cache.stats(), "fragment_cache": fragment_cache.stats(),
+            "object_cache": object_cache.stats()}, 200
+
+def upgrade_schema():
+    """Add columns and indexes introduced after a table was first created"""
+    table = BlogPost.__table__
+    existing = {column['name'] for column in db.inspect(db.engine).get_columns(table.name)}
+    for column in table.columns:
+        if column.name not in existing:
+            column_type = column.type.compile(dialect=db.engine.dialect)
+            db.session.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'))
+    db.session.commit()
+    for index in table.indexes:
+        index.create(bind=db.engine, checkfirst=True)
+    ensure_search_index(db)
+    ensure_job_table(db.engine)
+
+def warm_templates(app):
+    """Compile every template now rather than on the first request that uses it"""
+    for name in app.jinja_env.list_templates(extensions=['html']):
+        app.jinja_env.get_template(name)
+
+def create_app(name=None):
+    """Build the application for configuration ``name`` (see config.py).
+
+    The extensions are module-level objects that store the app's settings,
+    so there is one app per process; a second call raises RuntimeError
+    rather than silently reconfiguring the first app.
+    """
+    if built_apps:
+        raise RuntimeError(
+            'create_app() was already called in this process. The extensions are shared '
+            'module-level objects, so only one app per process is supported; set '
+            'FLASK_CONFIG to choose its configuration instead.')
+    app = Flask(__name__)
+    built_apps.append(app)
+    app.config.from_object(config[name or config_name()])
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(
+        app.config['SQLALCHEMY_DATABASE_URI'], app.config)
+
+    if app.config['JINJA_BYTECODE_CACHE']:
+        # Shared by all workers and kept across restarts; entries are keyed
+        # by template source checksum, so edited templates are recompiled.
+        cache_dir = app.config['JINJA_CACHE_DIR'] or os.path.join(app.instance_path, 'jinja-cache')
+        os.makedirs(cache_dir, exist_ok=True)
+        app.jinja_options = dict(app.jinja_options,
+                                 bytecode_cache=FileSystemBytecodeCache(cache_dir))
+
+    # Replica binds must be in the config before db.init_app creates the engines
+    replicas.init_app(app, db)
+    db.init_app(app)
+    with app.app_context():
+        apply_engine_profile(db.engine, app.config)
+        replicas.setup_engines()
+    # Shared caches hold primary data only; pinned visitors skip whole cached pages
+    page_cache.fill_context = object_cache.fill_context = replicas.primary
+    page_cache.bypass = replicas.pinned
+    # First, so its probe fast path runs before every other before_request hook
+    error_pages.init_app(app)
+    page_cache.init_app(app)
+    fragment_cache.init_app(app)
+    object_cache.init_app(app)
+    freezer.init_app(app)
+    health.init_app(app)
+    feeds.init_app(app)
+    jobs.init_app(app, db)
+    assets.init_app(app)
+    # Registered before the other after_request hooks so it runs last
+    compressor.init_app(app)
+    metrics.init_app(app)
+    app.after_request(after_request)
+
+    for rule, view, options in routes:
+        app.add_url_rule(rule, view_func=view, **options)
+    for code, handler in error_handlers:
+        app.register_error_handler(code, handler)
+
+    if app.config['TEMPLATE_WARMUP']:
+        # With gunicorn's preload_app this runs once in the master, and
+        # every forked (or recycled) worker starts with compiled templates
+        warm_templates(app)
+    return app
+
 def create_tables():
     """Create database tables if they don't exist"""
     try:
         with app.app_context():
             db.create_all()
+            upgrade_schema()
             print("✅ Database tables created successfully")
     except Exception as e:
         print(f"❌ Error creating database tables: {e}")
         # Don't fail startup if database creation fails
         pass
 
+# `python app.py` is the local development server; imported, it is production
+app = create_app(config_name('development') if __name__ == '__main__' else None)
+
 if __name__ == '__main__':
     create_tables()
     # Use environment variables for debug mode in production
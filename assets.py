@@ -0,0 +1,274 @@
+"""
+Static asset pipeline for the Portfolio Website
+
+``python setup.py build-assets`` copies each source asset to
+``static/dist`` under a content-hashed name, writes ``.gz`` and ``.br``
+siblings and records the mapping in ``static/dist/manifest.json``.
+Templates resolve assets through ``asset_url()``; the fingerprinted files
+are served from ``/assets/`` with immutable caching and the precompressed
+variant the client accepts.
+
+Stylesheets and scripts are minified on the way (see ``minify.py``), and
+``style.css`` loses the selectors no template or script can match. For
+every page template the build also extracts the critical CSS that styles
+its above-the-fold markup into ``critical.json``. ``base.html`` inlines it
+through ``critical_css()`` and loads the full stylesheet asynchronously.
+Each build prints the asset sizes and the render-blocking bytes of every
+page, and writes the same figures to ``report.json``.
+
+Font Awesome and Inter are subset and self-hosted as well (see
+``fonts.py``). ``fonts.json`` lists the families served locally and the
+font files ``base.html`` preloads.
+"""
+
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+
+from flask import request, send_from_directory, url_for
+from jinja2 import pass_context
+
+import minify
+from fonts import PRELOAD, build_fonts
+
+try:
+    import brotli
+except ImportError:  # Brotli is optional; gzip variants are always built
+    brotli = None
+
+# Paths relative to the static folder
+ASSET_SOURCES = ['css/style.css', 'css/highlight.css', 'js/script.js']
+DIST_DIR = 'dist'
+URL_PREFIX = '/assets/'
+MANIFEST_NAME = 'manifest.json'
+CRITICAL_NAME = 'critical.json'
+REPORT_NAME = 'report.json'
+FONTS_NAME = 'fonts.json'
+# Unused selectors are dropped from these; highlight.css styles Markdown output
+PRUNED_SOURCES = ['css/style.css']
+# The stylesheet base.html loads for every page, split into critical and deferred CSS
+CRITICAL_SOURCE = 'css/style.css'
+LAYOUT_TEMPLATE = 'base.html'
+ONE_YEAR = 365 * 24 * 60 * 60
+
+# Content-codings we precompress, in order of preference
+ENCODINGS = [('br', '.br'), ('gzip', '.gz')]
+
+
+def _fingerprint(path, data):
+    stem, ext = os.path.splitext(path)
+    return f"{stem}.{hashlib.sha256(data).hexdigest()[:12]}{ext}"
+
+
+def _write(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, 'wb') as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def _emit(dist, source, data, precompress=True):
+    """Write ``data`` under its fingerprinted name; return that name"""
+    target = _fingerprint(source, data)
+    output = os.path.join(dist, target)
+    _write(output, data)
+    if precompress:
+        # mtime=0 keeps the .gz byte-identical between builds
+        _write(output + '.gz', gzip.compress(data, compresslevel=9, mtime=0))
+        if brotli is not None:
+            _write(output + '.br', brotli.compress(data, quality=11))
+    return target
+
+
+def _read(path):
+    with open(path, encoding='utf-8') as f:
+        return f.read()
+
+
+def _templates(template_folder):
+    """Source of every template, by name"""
+    return {name: _read(os.path.join(template_folder, name))
+            for name in sorted(os.listdir(template_folder)) if name.endswith('.html')}
+
+
+def _gzip_size(data):
+    return len(gzip.compress(data, compresslevel=9, mtime=0))
+
+
+def build_assets(static_folder, sources=ASSET_SOURCES, template_folder=None):
+    """Minify, fingerprint and precompress ``sources``; return the manifest
+
+    With ``template_folder``, unused CSS is pruned against the templates and
+    scripts, and critical CSS plus a size report are written as well.
+    """
+    dist = os.path.join(static_folder, DIST_DIR)
+    templates = _templates(template_folder) if template_folder else {}
+    corpus = ''.join(templates.values()) + ''.join(
+        _read(os.path.join(static_folder, source)) for source in sources if source.endswith('.js'))
+    words, prefixes = minify.markup_tokens(corpus)
+
+    manifest = {}
+    sizes = {}
+    stylesheets = {}
+    fonts_css, families = '', []
+    if templates:
+        def emit(name, data):
+            # WOFF2 is already compressed
+            manifest[name] = _emit(dist, name, data, precompress=False)
+            return URL_PREFIX + manifest[name]
+        stylesheet_text = ''.join(_read(os.path.join(static_folder, source))
+                                  for source in sources if source.endswith('.css'))
+        fonts_css, families = build_fonts(static_folder, corpus, stylesheet_text, emit)
+
+    for source in sources:
+        original = _read(os.path.join(static_folder, source))
+        text = original
+        if source.endswith('.css'):
+            nodes = minify.parse_css(original)
+            if source == CRITICAL_SOURCE and fonts_css:
+                nodes = minify.parse_css(fonts_css) + nodes
+            if templates and source in PRUNED_SOURCES:
+                nodes = minify.prune_css(nodes, words, prefixes)
+            stylesheets[source] = nodes
+            text = minify.serialize_css(nodes)
+        elif source.endswith('.js'):
+            text = minify.minify_js(original)
+        data = text.encode()
+        target = _emit(dist, source, data)
+        manifest[source] = target
+        sizes[source] = {'source': len(original.encode()), 'minified': len(data),
+                         'gzip': _gzip_size(data)}
+        print(f"📦 {source} -> {DIST_DIR}/{target} "
+              f"({len(original.encode())} -> {len(data)} bytes, {sizes[source]['gzip']} gzipped)")
+
+    critical = {}
+    if templates and CRITICAL_SOURCE in stylesheets:
+        critical = build_critical_css(templates, stylesheets[CRITICAL_SOURCE], prefixes)
+    _write(os.path.join(dist, CRITICAL_NAME), json.dumps(critical, indent=2, sort_keys=True).encode())
+    _write(os.path.join(dist, FONTS_NAME), json.dumps({
+        'families': families,
+        'preload': [name for name in PRELOAD if name in manifest],
+    }, indent=2, sort_keys=True).encode())
+    if templates:
+        report = blocking_report(templates, sizes, critical)
+        _write(os.path.join(dist, REPORT_NAME), json.dumps(
+            {'assets': sizes, 'pages': report}, indent=2, sort_keys=True).encode())
+        print_report(report)
+
+    _write(os.path.join(dist, MANIFEST_NAME), json.dumps(manifest, indent=2, sort_keys=True).encode())
+    return manifest
+
+
+def build_critical_css(templates, nodes, prefixes):
+    """Critical CSS for every template that extends the layout"""
+    layout = templates.get(LAYOUT_TEMPLATE, '')
+    critical = {}
+    for name, source in templates.items():
+        if f'extends "{LAYOUT_TEMPLATE}"' not in source and f"extends '{LAYOUT_TEMPLATE}'" not in source:
+            continue
+        words, page_prefixes = minify.markup_tokens(minify.above_the_fold(layout, source))
+        critical[name] = minify.serialize_css(
+            minify.critical_css(nodes, words, page_prefixes | prefixes))
+    return critical
+
+
+def _stylesheets(source):
+    return [path for path in ASSET_SOURCES if path.endswith('.css')
+            and (f"asset_url('{path}')" in source or f'asset_url("{path}")' in source)]
+
+
+def blocking_report(templates, sizes, critical):
+    """Bytes of CSS each page must fetch before its first render, before and after
+
+    Before: the unprocessed stylesheets, all linked render-blocking. After:
+    the inlined critical CSS plus the minified stylesheets that still block.
+    """
+    layout = _stylesheets(templates.get(LAYOUT_TEMPLATE, ''))
+    report = {}
+    for name, css in critical.items():
+        linked = layout + [path for path in _stylesheets(templates[name]) if path not in layout]
+        still_blocking = [path for path in linked if path != CRITICAL_SOURCE]
+        report[name] = {
+            'before': sum(sizes[path]['source'] for path in linked if path in sizes),
+            'inline': len(css.encode()),
+            'blocking': sum(sizes[path]['minified'] for path in still_blocking if path in sizes),
+            'blocking_gzip': _gzip_size(css.encode()) + sum(
+                sizes[path]['gzip'] for path in still_blocking if path in sizes),
+        }
+        report[name]['after'] = report[name]['inline'] + report[name]['blocking']
+    return report
+
+
+def print_report(report):
+    print(f"\n{'page':<22} {'blocking before':>16} {'inline':>8} {'blocking after':>15} {'gzipped':>8}")
+    for name, row in sorted(report.items()):
+        print(f"{name:<22} {row['before']:>16} {row['inline']:>8} {row['after']:>15} "
+              f"{row['blocking_gzip']:>8}")
+
+
+class Assets:
+    """Resolves source asset names to fingerprinted URLs and serves them"""
+
+    def __init__(self, app=None):
+        self.manifest = {}
+        self.critical = {}
+        self.fonts = {'families': [], 'preload': []}
+        self.dist_folder = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.dist_folder = os.path.join(app.static_folder, DIST_DIR)
+        self.manifest = self.load_manifest()
+        # Only usable together with the stylesheet it was extracted from
+        self.critical = self.load_manifest(CRITICAL_NAME) if self.manifest else {}
+        if self.manifest:
+            self.fonts.update(self.load_manifest(FONTS_NAME))
+        # Part of every page ETag, so HTML pointing at old fingerprints is re-sent
+        app.config['ASSET_VERSION'] = hashlib.sha1(json.dumps(
+            [self.manifest, self.critical, self.fonts], sort_keys=True).encode()).hexdigest()
+        app.add_url_rule(URL_PREFIX + '<path:filename>', 'assets', self.serve)
+        app.jinja_env.globals['asset_url'] = self.url
+        app.jinja_env.globals['critical_css'] = self.critical_css
+        app.jinja_env.globals['self_hosted_fonts'] = self.fonts
+
+    def load_manifest(self, name=MANIFEST_NAME):
+        try:
+            with open(os.path.join(self.dist_folder, name)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    @pass_context
+    def critical_css(self, context):
+        """Inline CSS for the template being rendered; empty when there is none"""
+        return self.critical.get(context.name, '')
+
+    def url(self, filename):
+        """URL for ``filename``; falls back to /static when assets are not built"""
+        fingerprinted = self.manifest.get(filename)
+        if fingerprinted is None:
+            return url_for('static', filename=filename)
+        return url_for('assets', filename=fingerprinted)
+
+    def serve(self, filename):
+        """Serve a fingerprinted asset, preferring a precompressed variant"""
+        mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+        encoding = None
+        for coding, suffix in ENCODINGS:
+            if request.accept_encodings[coding] and os.path.isfile(
+                    os.path.join(self.dist_folder, filename + suffix)):
+                encoding, filename = coding, filename + suffix
+                break
+
+        response = send_from_directory(self.dist_folder, filename, mimetype=mimetype,
+                                       max_age=ONE_YEAR)
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+        response.vary.add('Accept-Encoding')
+        response.cache_control.public = True
+        response.cache_control.immutable = True
+        return response
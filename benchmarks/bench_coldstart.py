@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Worker cold-start benchmark
+Starts fresh interpreters the way a non-preloaded gunicorn worker would,
+and times importing the app and the first and second request to a few
+template-heavy routes. It compares three setups: no Jinja bytecode cache,
+a warm on-disk bytecode cache, and the bytecode cache plus template
+warm-up at boot. A fourth run forks the timed process after import, the
+way gunicorn's preload_app starts (and recycles) workers.
+
+    python benchmarks/bench_coldstart.py --runs 5
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+ROUTES = ['/', '/blog', '/about', '/blog/1']
+
+# (name, environment)
+SCENARIOS = [
+    ('no cache', {'JINJA_BYTECODE_CACHE': 'false', 'TEMPLATE_WARMUP': 'false'}),
+    ('bytecode cache', {'JINJA_BYTECODE_CACHE': 'true', 'TEMPLATE_WARMUP': 'false'}),
+    ('cache + warm-up', {'JINJA_BYTECODE_CACHE': 'true', 'TEMPLATE_WARMUP': 'true'}),
+    ('preload fork', {'JINJA_BYTECODE_CACHE': 'true', 'TEMPLATE_WARMUP': 'true',
+                      'BENCH_FORK': '1'}),
+]
+
+PROBE = '''
+import json, os, sys, time
+started = time.perf_counter()
+from app import app, db
+imported = time.perf_counter()
+if os.environ.get('BENCH_FORK'):
+    # The master pays for the import once; report what the worker pays
+    if os.fork():
+        os.wait()
+        sys.exit()
+    with app.app_context():
+        db.engine.dispose(close=False)
+    started = imported = time.perf_counter()
+client = app.test_client()
+first, second = [], []
+for path in sys.argv[1:]:
+    t = time.perf_counter(); client.get(path); first.append(time.perf_counter() - t)
+for path in sys.argv[1:]:
+    t = time.perf_counter(); client.get(path); second.append(time.perf_counter() - t)
+print(json.dumps({"import": imported - started, "first": sum(first), "second": sum(second)}))
+'''
+
+
+def probe(env):
+    output = subprocess.check_output([sys.executable, '-c', PROBE] + ROUTES,
+                                     cwd=ROOT, env=env, text=True)
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='bench-coldstart-')
+    base = dict(os.environ, FLASK_CONFIG='production', SECRET_KEY='bench', PAGE_CACHE_SIZE='0',
+                DATABASE_URL=f"sqlite:///{os.path.join(workdir, 'bench.db')}",
+                JINJA_CACHE_DIR=os.path.join(workdir, 'jinja-cache'),
+                METRICS_DIR=os.path.join(workdir, 'metrics'))
+    subprocess.check_call([sys.executable, 'setup.py'], cwd=ROOT, env=base,
+                          stdout=subprocess.DEVNULL)
+
+    print(f"{'scenario':<16} {'import ms':>10} {'first ms':>10} {'second ms':>10}")
+    for name, overrides in SCENARIOS:
+        env = dict(base, **overrides)
+        # One untimed run fills the on-disk bytecode cache
+        probe(env)
+        runs = [probe(env) for _ in range(args.runs)]
+        print(f"{name:<16} "
+              f"{statistics.median(r['import'] for r in runs) * 1000:>10.1f} "
+              f"{statistics.median(r['first'] for r in runs) * 1000:>10.1f} "
+              f"{statistics.median(r['second'] for r in runs) * 1000:>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
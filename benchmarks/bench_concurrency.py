@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+Reader/writer concurrency benchmark
+Runs /blog readers against a SQLite database while a writer keeps
+inserting posts, once with SQLAlchemy defaults (rollback journal) and once
+with the tuned engine profile (WAL), and reports reader latency, stalls
+and "database is locked" errors for each.
+
+    python benchmarks/bench_concurrency.py --readers 4 --duration 10
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+PROFILES = ['default', 'tuned']
+
+
+def percentile(sorted_samples, fraction):
+    index = max(0, int(round(fraction * len(sorted_samples))) - 1)
+    return sorted_samples[index]
+
+
+def seed(count):
+    from app import BlogPost, db
+    from setup import sample_post_data
+
+    samples = sample_post_data()
+    start = datetime(2020, 1, 1)
+    rows = []
+    for i in range(count):
+        sample = samples[i % len(samples)]
+        posted = start + timedelta(minutes=i)
+        rows.append({'title': f"{sample['title']} #{i}", 'content': sample['content'],
+                     'excerpt': sample['content'][:200], 'date_posted': posted,
+                     'date_updated': posted})
+    db.session.execute(BlogPost.__table__.insert(), rows)
+    db.session.commit()
+
+
+def write_posts(args, stop, commits):
+    """Writer process: insert ``write_batch`` posts per transaction until stopped"""
+    from app import app, db, BlogPost, summarize_content
+    from rendering import render_fields
+
+    content = 'Written during the benchmark. ' * 50
+    derived = dict(summarize_content(content), **render_fields(content))
+    sequence = 0
+    with app.app_context():
+        db.engine.dispose(close=False)
+        while not stop.is_set():
+            # Core inserts keep the writer's CPU time low, so what the readers
+            # see is lock contention rather than the writer's Python overhead
+            now = datetime.now()
+            rows = []
+            for _ in range(args.write_batch):
+                sequence += 1
+                rows.append(dict(derived, title=f'Concurrent write {sequence}', content=content,
+                                 date_posted=now, date_updated=now))
+            try:
+                db.session.execute(BlogPost.__table__.insert(), rows)
+                db.session.commit()
+                commits.value += 1
+            except Exception:
+                db.session.rollback()
+
+
+def measure(args):
+    """Child process: drive one profile (selected by DATABASE_PROFILE) and print JSON"""
+    from app import app, db, BlogPost, upgrade_schema
+    from engine_profiles import describe
+
+    with app.app_context():
+        db.create_all()
+        upgrade_schema()
+        seed(args.posts)
+        settings = describe(db.engine)
+
+    stop = threading.Event()
+    lock = threading.Lock()
+    latencies, errors = [], [0]
+
+    def reader():
+        client = app.test_client()
+        mine = []
+        while not stop.is_set():
+            started = time.perf_counter()
+            response = client.get('/blog')
+            elapsed = (time.perf_counter() - started) * 1000
+            if response.status_code != 200 or b'Unable to load' in response.data:
+                with lock:
+                    errors[0] += 1
+            mine.append(elapsed)
+        with lock:
+            latencies.extend(mine)
+
+    # The writer is a separate process, as it would be under gunicorn, so
+    # readers only wait on database locks and not on the writer's GIL.
+    writer_stop = multiprocessing.Event()
+    commits = multiprocessing.Value('i', 0)
+    writer = multiprocessing.Process(target=write_posts, args=(args, writer_stop, commits))
+    writer.start()
+    threads = [threading.Thread(target=reader) for _ in range(args.readers)]
+    for thread in threads:
+        thread.start()
+    time.sleep(args.duration)
+    stop.set()
+    writer_stop.set()
+    for thread in threads:
+        thread.join()
+    writer.join()
+
+    latencies.sort()
+    print(json.dumps({
+        'settings': settings,
+        'reads': len(latencies),
+        'reads_per_s': round(len(latencies) / args.duration, 1),
+        'commits': commits.value,
+        'errors': errors[0],
+        'p50_ms': round(percentile(latencies, 0.50), 2),
+        'p99_ms': round(percentile(latencies, 0.99), 2),
+        'max_ms': round(latencies[-1], 2),
+        'stalls': sum(1 for value in latencies if value >= args.stall_ms),
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--posts', type=int, default=5000)
+    parser.add_argument('--readers', type=int, default=4)
+    parser.add_argument('--duration', type=float, default=10, help="seconds per profile")
+    parser.add_argument('--write-batch', type=int, default=50,
+                        help="posts inserted per write transaction")
+    parser.add_argument('--stall-ms', type=float, default=100,
+                        help="reads slower than this count as stalls")
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        measure(args)
+        return
+
+    workdir = tempfile.mkdtemp(prefix='bench-concurrency-')
+    print(f"{'profile':<9} {'journal':>8} {'reads/s':>8} {'p50':>7} {'p99':>8} {'max':>8} "
+          f"{'stalls':>7} {'commits':>8} {'errors':>7}")
+    for profile in PROFILES:
+        env = dict(os.environ, DATABASE_PROFILE=profile, SECRET_KEY='bench',
+                   DATABASE_URL=f"sqlite:///{os.path.join(workdir, profile + '.db')}")
+        output = subprocess.check_output(
+            [sys.executable, os.path.abspath(__file__), '--child'] + sys.argv[1:],
+            cwd=ROOT, env=env, text=True)
+        result = json.loads(output.strip().splitlines()[-1])
+        print(f"{profile:<9} {result['settings']['journal_mode']:>8} {result['reads_per_s']:>8} "
+              f"{result['p50_ms']:>7} {result['p99_ms']:>8} {result['max_ms']:>8} "
+              f"{result['stalls']:>7} {result['commits']:>8} {result['errors']:>7}")
+
+
+if __name__ == '__main__':
+    main()
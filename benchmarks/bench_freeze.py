@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Static export benchmark
+Seeds a throwaway SQLite database with N posts, freezes the whole site,
+then publishes one more post and times the incremental rebuild.
+
+    python benchmarks/bench_freeze.py --posts 10000
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--posts', type=int, default=10000)
+    parser.add_argument('--precompress', action='store_true')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='bench-freeze-')
+    output = os.path.join(workdir, 'site')
+    os.environ.update(DATABASE_URL=f"sqlite:///{os.path.join(workdir, 'bench.db')}",
+                      OBJECT_CACHE_PATH=os.path.join(workdir, 'object-cache.db'),
+                      METRICS_DIR=os.path.join(workdir, 'metrics'),
+                      FLASK_CONFIG='production', SECRET_KEY='bench')
+
+    from app import app, db, BlogPost, upgrade_schema, freezer
+    from importer import import_posts
+    from setup import sample_post_data
+
+    app.config['FREEZE_PRECOMPRESS'] = args.precompress
+    samples = sample_post_data()
+    start = datetime(2020, 1, 1)
+    records = ({'title': f"{samples[i % len(samples)]['title']} #{i}",
+                'content': samples[i % len(samples)]['content'],
+                'date_posted': start + timedelta(minutes=i)} for i in range(args.posts))
+    with app.app_context():
+        db.create_all()
+        upgrade_schema()
+        print(f"🔧 Seeding {args.posts} posts into {workdir} ...")
+        import_posts(records, progress=None)
+
+    stats = freezer.freeze(app, output, progress=None)
+    print(f"🧊 Full build: {stats['seconds']} s "
+          f"({stats['pages']} pages, {stats['listing_pages']} listing pages, "
+          f"{stats['posts']} posts; listings {stats['listing_seconds']} s)")
+
+    with app.app_context():
+        post = BlogPost(title='Freshly published', content='Incremental rebuild test')
+        db.session.add(post)
+        db.session.commit()
+        post_id = post.id
+    started = time.monotonic()
+    freezer.rebuild_published(app, [post_id], output)
+    print(f"⚡ Incremental rebuild after publishing: {time.monotonic() - started:.2f} s")
+
+
+if __name__ == '__main__':
+    main()
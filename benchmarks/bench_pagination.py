@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Pagination benchmark
+Seeds a throwaway SQLite database with synthetic posts and compares the
+latency of keyset pages against OFFSET pages from page 1 to the last page.
+
+    python benchmarks/bench_pagination.py --posts 100000
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def seed(db, BlogPost, count):
+    """Insert ``count`` synthetic posts in batches"""
+    start = datetime(2020, 1, 1)
+    batch = []
+    for i in range(count):
+        batch.append({
+            'title': f'Synthetic post {i}',
+            'content': f'Body of synthetic post {i}. ' * 20,
+            # Every tenth post shares a timestamp so the id tie-breaker matters
+            'date_posted': start + timedelta(minutes=i - i % 10),
+        })
+        if len(batch) == 5000:
+            db.session.execute(BlogPost.__table__.insert(), batch)
+            batch = []
+    if batch:
+        db.session.execute(BlogPost.__table__.insert(), batch)
+    db.session.commit()
+
+
+def timed(fn, repeat):
+    """Median wall time of ``fn`` in milliseconds"""
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--posts', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='bench-pagination-')
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+
+    from app import app, db, BlogPost
+    from pagination import paginate_posts
+
+    per_page = app.config['POSTS_PER_PAGE']
+    last_page = args.posts // per_page
+    checkpoints = sorted({1, 10, 100, 1000, last_page // 2, last_page})
+
+    with app.app_context():
+        db.create_all()
+        print(f"🔧 Seeding {args.posts} posts into {workdir} ...")
+        seed(db, BlogPost, args.posts)
+
+        # Walk the whole archive once through the cursors, remembering the
+        # cursor that leads to each checkpoint page.
+        cursors = {1: None}
+        page, number = paginate_posts(BlogPost.query, BlogPost, per_page), 1
+        while page.has_next and number < last_page:
+            number += 1
+            if number in checkpoints:
+                cursors[number] = page.next_cursor
+            page = paginate_posts(BlogPost.query, BlogPost, per_page, after=page.next_cursor)
+
+        client = app.test_client()
+        print(f"\n{'page':>8} {'keyset ms':>10} {'offset ms':>10} {'GET /blog ms':>13}")
+        for number in checkpoints:
+            cursor = cursors.get(number)
+            keyset = timed(lambda: paginate_posts(
+                BlogPost.query, BlogPost, per_page, after=cursor).items, args.repeat)
+            offset = timed(lambda: BlogPost.query.order_by(
+                BlogPost.date_posted.desc(), BlogPost.id.desc()
+            ).offset((number - 1) * per_page).limit(per_page).all(), args.repeat)
+            url = f'/blog?after={cursor}' if cursor else '/blog'
+            view = timed(lambda: client.get(url), args.repeat)
+            print(f"{number:>8} {keyset:>10.2f} {offset:>10.2f} {view:>13.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Search benchmark
+Seeds a throwaway SQLite database with synthetic posts, builds the FTS5
+index and compares ranked full-text queries against a LIKE scan.
+
+    python benchmarks/bench_search.py --posts 100000
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+TOPICS = ['kubernetes', 'terraform', 'terragrunt', 'lambda', 'prometheus', 'grafana',
+          'gitlab', 'docker', 'helm', 'ansible', 'cloudwatch', 'eks']
+QUERIES = ['kubernetes', 'terraform modules', 'prometheus grafana', 'terra', 'zzzz']
+
+
+def synthetic_posts(count, rng):
+    """Posts of ~150 words drawn from a 5,000 word vocabulary plus topic words"""
+    vocabulary = [f'word{i}' for i in range(5000)]
+    start = datetime(2020, 1, 1)
+    for i in range(count):
+        words = rng.choices(vocabulary, k=150) + rng.sample(TOPICS, 2)
+        rng.shuffle(words)
+        yield {
+            'title': f'{rng.choice(TOPICS).title()} notes {i}',
+            'content': ' '.join(words),
+            'date_posted': start + timedelta(minutes=i),
+        }
+
+
+def timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--posts', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=10)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='bench-search-')
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+
+    from sqlalchemy import text
+    from app import app, db, BlogPost, upgrade_schema
+    from search import rebuild_search_index, search_posts
+
+    with app.app_context():
+        db.create_all()
+        upgrade_schema()
+        print(f"🔧 Seeding {args.posts} posts into {workdir} ...")
+        batch = []
+        for row in synthetic_posts(args.posts, random.Random(42)):
+            batch.append(row)
+            if len(batch) == 5000:
+                db.session.execute(BlogPost.__table__.insert(), batch)
+                batch = []
+        if batch:
+            db.session.execute(BlogPost.__table__.insert(), batch)
+        db.session.commit()
+
+        started = time.perf_counter()
+        rebuild_search_index(db)
+        print(f"⏱  Index rebuild: {time.perf_counter() - started:.2f} s")
+
+        client = app.test_client()
+        like = text("SELECT id FROM blog_post WHERE title LIKE :p OR content LIKE :p "
+                    "ORDER BY date_posted DESC LIMIT 20")
+        print(f"\n{'query':<22} {'hits':>5} {'fts ms':>8} {'like ms':>9} {'GET ms':>8}")
+        for query in QUERIES:
+            hits = len(search_posts(db, query))
+            fts = timed(lambda: search_posts(db, query), args.repeat)
+            scan = timed(lambda: db.session.execute(
+                like, {'p': f'%{query}%'}).fetchall(), args.repeat)
+            view = timed(lambda: client.get('/blog/search', query_string={'q': query}), args.repeat)
+            print(f"{query:<22} {hits:>5} {fts:>8.2f} {scan:>9.2f} {view:>8.2f}")
+
+
+if __name__ == '__main__':
+    main()
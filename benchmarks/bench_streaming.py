@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Streaming archive benchmark
+Seeds throwaway SQLite databases with 1k, 10k and 100k synthetic posts and
+measures /blog/archive two ways, each in a fresh process: streamed (rows
+read with yield_per, HTML sent as it renders) and buffered (every row
+loaded and the whole page rendered to one string first, as
+render_template would). It reports time to first byte, total time and
+peak RSS growth over the idle process.
+
+    python benchmarks/bench_streaming.py --posts 1000 10000 100000
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+PROBE = '''
+import json, resource, sys, time
+from werkzeug.test import EnvironBuilder
+from flask import render_template
+from sqlalchemy import select
+from app import app, db, BlogPost
+
+def rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+# Compile the templates and open the pool before the baseline is taken
+with app.test_request_context('/blog/archive'):
+    render_template('archive.html', posts=[])
+    db.session.execute(select(1))
+idle = rss_mb()
+
+started = time.perf_counter()
+if sys.argv[1] == 'streamed':
+    environ = EnvironBuilder(path='/blog/archive').get_environ()
+    chunks = iter(app(environ, lambda status, headers: None))
+    size = len(next(chunks))
+    first = time.perf_counter()
+    for chunk in chunks:
+        size += len(chunk)
+    chunks.close()
+else:
+    with app.test_request_context('/blog/archive'):
+        rows = db.session.execute(
+            select(BlogPost.id, BlogPost.title, BlogPost.date_posted, BlogPost.excerpt)
+            .order_by(BlogPost.date_posted.desc(), BlogPost.id.desc())).all()
+        size = len(render_template('archive.html', posts=rows).encode())
+    first = time.perf_counter()
+total = time.perf_counter()
+print(json.dumps({"ttfb": first - started, "total": total - started, "size": size,
+                  "rss": rss_mb() - idle}))
+'''
+
+
+def seed(database_url, count):
+    """Insert ``count`` posts with precomputed listing fields"""
+    env = dict(os.environ, DATABASE_URL=database_url)
+    script = f'''
+from datetime import datetime, timedelta
+from app import app, db, BlogPost, summarize_content, upgrade_schema
+with app.app_context():
+    db.create_all()
+    upgrade_schema()
+    start = datetime(2020, 1, 1)
+    batch = []
+    for i in range({count}):
+        content = f"Body of synthetic post {{i}}. " * 20
+        batch.append(dict(title=f"Synthetic post {{i}}", content=content,
+                          date_posted=start + timedelta(minutes=i), **summarize_content(content)))
+        if len(batch) == 5000:
+            db.session.execute(BlogPost.__table__.insert(), batch)
+            batch = []
+    if batch:
+        db.session.execute(BlogPost.__table__.insert(), batch)
+    db.session.commit()
+'''
+    subprocess.check_call([sys.executable, '-c', script], cwd=ROOT, env=env)
+
+
+def probe(env, mode):
+    output = subprocess.check_output([sys.executable, '-c', PROBE, mode],
+                                     cwd=ROOT, env=env, text=True)
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--posts', type=int, nargs='+', default=[1000, 10000, 100000])
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='bench-streaming-')
+    base = dict(os.environ, FLASK_CONFIG='production', SECRET_KEY='bench',
+                OBJECT_CACHE_BACKEND='none', JOBS_WORKERS='0',
+                METRICS_DIR=os.path.join(workdir, 'metrics'),
+                FEEDS_DIR=os.path.join(workdir, 'feeds'),
+                JINJA_CACHE_DIR=os.path.join(workdir, 'jinja-cache'))
+
+    print(f"{'posts':>8} {'mode':<9} {'TTFB ms':>10} {'total ms':>10} {'page MB':>8} {'peak RSS +MB':>13}")
+    for count in args.posts:
+        database_url = f"sqlite:///{os.path.join(workdir, f'bench-{count}.db')}"
+        seed(database_url, count)
+        env = dict(base, DATABASE_URL=database_url)
+        for mode in ('buffered', 'streamed'):
+            result = probe(env, mode)
+            print(f"{count:>8} {mode:<9} {result['ttfb'] * 1000:>10.1f} "
+                  f"{result['total'] * 1000:>10.1f} {result['size'] / 1e6:>8.1f} "
+                  f"{result['rss']:>13.1f}")
+
+
+if __name__ == '__main__':
+    main()
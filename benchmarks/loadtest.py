@@ -0,0 +1,307 @@
+#!/usr/bin/env python3
+"""
+Load-test and latency benchmark
+Seeds a throwaway database with synthetic posts derived from the sample
+posts in setup.py, boots the app under the real gunicorn.conf.py and drives
+every route in turn at a fixed concurrency. Writes a JSON report with
+throughput, latency percentiles and per-worker RSS.
+
+    python benchmarks/loadtest.py --posts 10000 --concurrency 16 --output before.json
+    python benchmarks/loadtest.py --compare before.json after.json
+"""
+
+import argparse
+import http.client
+import json
+import os
+import platform
+import random
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# (name, method, path) - "{id}" is replaced by a random existing post id
+ROUTES = [
+    ('home', 'GET', '/'),
+    ('old_home', 'GET', '/old-home'),
+    ('about', 'GET', '/about'),
+    ('experience', 'GET', '/experience'),
+    ('projects', 'GET', '/projects'),
+    ('contact', 'GET', '/contact'),
+    ('blog', 'GET', '/blog'),
+    ('blog_json', 'GET', '/api/posts'),
+    ('blog_post', 'GET', '/blog/{id}'),
+    ('blog_search', 'GET', '/blog/search?q=kubernetes'),
+    ('new_blog_post', 'POST', '/blog/new'),
+    ('health', 'GET', '/health'),
+]
+
+
+def seed(database_url, count):
+    """Create the schema and ``count`` posts cloned from the sample posts"""
+    os.environ['DATABASE_URL'] = database_url
+    from app import app, db, BlogPost, summarize_content, upgrade_schema
+    from search import rebuild_search_index
+    from rendering import render_fields
+    from setup import sample_post_data
+
+    samples = sample_post_data()
+    rendered = [render_fields(sample['content']) for sample in samples]
+    start = datetime(2020, 1, 1)
+    with app.app_context():
+        db.create_all()
+        upgrade_schema()
+        batch = []
+        for i in range(count):
+            sample = samples[i % len(samples)]
+            posted = start + timedelta(minutes=i)
+            row = {
+                'title': f"{sample['title']} #{i}",
+                'content': sample['content'],
+                'date_posted': posted,
+                'date_updated': posted,
+            }
+            row.update(summarize_content(row['content']))
+            row.update(rendered[i % len(samples)])
+            batch.append(row)
+            if len(batch) == 2000:
+                db.session.execute(BlogPost.__table__.insert(), batch)
+                batch = []
+        if batch:
+            db.session.execute(BlogPost.__table__.insert(), batch)
+        db.session.commit()
+        rebuild_search_index(db)
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def wait_until_up(port, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=2)
+            conn.request('GET', '/health')
+            if conn.getresponse().status == 200:
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError("gunicorn did not come up in time")
+
+
+def worker_pids(master_pid):
+    """PIDs of the gunicorn workers forked by ``master_pid``"""
+    pids = []
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat') as f:
+                fields = f.read().rsplit(')', 1)[1].split()
+        except OSError:
+            continue
+        if int(fields[1]) == master_pid:
+            pids.append(int(entry))
+    return pids
+
+
+def rss_kb(pid):
+    try:
+        with open(f'/proc/{pid}/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def percentile(sorted_samples, fraction):
+    """Nearest-rank percentile of an ascending list"""
+    if not sorted_samples:
+        return None
+    index = max(0, int(round(fraction * len(sorted_samples))) - 1)
+    return sorted_samples[index]
+
+
+def drive(port, method, path, concurrency, duration, max_id):
+    """Hammer one route from ``concurrency`` keep-alive clients"""
+    samples, errors, reconnects = [], [0], [0]
+    lock = threading.Lock()
+    stop = time.monotonic() + duration
+
+    def client(number):
+        rng = random.Random(number)
+        conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+        mine = []
+        sequence = 0
+        while time.monotonic() < stop:
+            url = path.replace('{id}', str(rng.randint(1, max_id)))
+            body, headers = None, {'Accept-Encoding': 'gzip, br'}
+            if method == 'POST':
+                sequence += 1
+                body = f'title=Load+test+{number}-{sequence}-{time.time_ns()}&content=Load+test+body'
+                headers['Content-Type'] = 'application/x-www-form-urlencoded'
+            started = time.perf_counter()
+            for attempt in range(2):
+                try:
+                    conn.request(method, url, body=body, headers=headers)
+                    response = conn.getresponse()
+                    response.read()
+                    break
+                except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                    # A recycled worker closed our keep-alive connection
+                    conn.close()
+                    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+                    with lock:
+                        reconnects[0] += 1
+            else:
+                with lock:
+                    errors[0] += 1
+                continue
+            mine.append((time.perf_counter() - started) * 1000)
+            if response.status >= 500:
+                with lock:
+                    errors[0] += 1
+        conn.close()
+        with lock:
+            samples.extend(mine)
+
+    threads = [threading.Thread(target=client, args=(n,)) for n in range(concurrency)]
+    started = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - started
+
+    samples.sort()
+    return {
+        'requests': len(samples),
+        'errors': errors[0],
+        'reconnects': reconnects[0],
+        'rps': round(len(samples) / elapsed, 1),
+        'mean_ms': round(sum(samples) / len(samples), 2) if samples else None,
+        'p50_ms': round(percentile(samples, 0.50), 2) if samples else None,
+        'p95_ms': round(percentile(samples, 0.95), 2) if samples else None,
+        'p99_ms': round(percentile(samples, 0.99), 2) if samples else None,
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'],
+                                       cwd=ROOT, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(args):
+    workdir = tempfile.mkdtemp(prefix='loadtest-')
+    database_url = args.database_url or f"sqlite:///{os.path.join(workdir, 'loadtest.db')}"
+    print(f"🔧 Seeding {args.posts} posts ({database_url}) ...")
+    seed(database_url, args.posts)
+
+    port = free_port()
+    env = dict(os.environ, DATABASE_URL=database_url, PORT=str(port),
+               GUNICORN_PROFILE=args.profile, SECRET_KEY='loadtest')
+    if args.workers:
+        env['WEB_CONCURRENCY'] = str(args.workers)
+    server = subprocess.Popen(
+        ['gunicorn', 'app:app', '-c', 'gunicorn.conf.py',
+         '--access-logfile', '/dev/null', '--log-level', 'warning'],
+        cwd=ROOT, env=env)
+    report = {
+        'meta': {
+            'revision': git_revision(),
+            'started_at': datetime.now(timezone.utc).isoformat(),
+            'posts': args.posts,
+            'concurrency': args.concurrency,
+            'duration_s': args.duration,
+            'profile': args.profile,
+            'workers': args.workers,
+            'cpus': os.cpu_count(),
+            'python': platform.python_version(),
+        },
+        'routes': {},
+        'workers': {},
+    }
+    try:
+        wait_until_up(port)
+        print(f"\n{'route':<14} {'req/s':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'errors':>7}")
+        for name, method, path in ROUTES:
+            if args.routes and name not in args.routes:
+                continue
+            stats = drive(port, method, path, args.concurrency, args.duration, args.posts)
+            report['routes'][name] = stats
+            print(f"{name:<14} {stats['rps']:>8} {stats['p50_ms']:>8} {stats['p95_ms']:>8} "
+                  f"{stats['p99_ms']:>8} {stats['errors']:>7}")
+            for pid in worker_pids(server.pid):
+                rss = rss_kb(pid)
+                if rss:
+                    previous = report['workers'].get(str(pid), 0)
+                    report['workers'][str(pid)] = max(previous, rss)
+    finally:
+        server.send_signal(signal.SIGTERM)
+        server.wait(timeout=30)
+
+    rss_values = list(report['workers'].values())
+    if rss_values:
+        print(f"\n🧠 Peak RSS per worker: {', '.join(f'{v // 1024} MB' for v in rss_values)}")
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+    print(f"📝 Report written to {args.output}")
+
+
+def compare(before_path, after_path):
+    """Print per-route throughput and p99 deltas between two reports"""
+    with open(before_path) as f:
+        before = json.load(f)
+    with open(after_path) as f:
+        after = json.load(f)
+
+    def delta(old, new):
+        if not old or new is None:
+            return '   n/a'
+        return f"{(new - old) / old * 100:+6.1f}%"
+
+    print(f"{before['meta'].get('revision')} -> {after['meta'].get('revision')}\n")
+    print(f"{'route':<14} {'req/s':>9} {'':>8} {'p99 ms':>9} {'':>8}")
+    for name, new in after['routes'].items():
+        old = before['routes'].get(name, {})
+        print(f"{name:<14} {new['rps']:>9} {delta(old.get('rps'), new['rps']):>8} "
+              f"{new['p99_ms']:>9} {delta(old.get('p99_ms'), new['p99_ms']):>8}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--posts', type=int, default=1000)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--duration', type=float, default=10, help="seconds per route")
+    parser.add_argument('--profile', default='gthread', choices=['sync', 'gthread', 'async'])
+    parser.add_argument('--workers', type=int, help="override WEB_CONCURRENCY")
+    parser.add_argument('--routes', nargs='*', help="only drive these route names")
+    parser.add_argument('--database-url', help="seed this database instead of a temp SQLite file")
+    parser.add_argument('--output', default='loadtest.json')
+    parser.add_argument('--compare', nargs=2, metavar=('BEFORE', 'AFTER'))
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+    else:
+        run(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,143 @@
+"""
+Dynamic response compression for the Portfolio Website
+
+Compresses HTML, JSON and other text responses with brotli or gzip,
+whichever the client prefers, from an ``after_request`` hook. Streamed
+bodies are compressed chunk by chunk with a sync flush so the client still
+receives each chunk as soon as it is produced. Responses that already carry
+a Content-Encoding (precompressed assets) or are file passthroughs are left
+untouched.
+"""
+
+import zlib
+
+from flask import g, request
+
+try:
+    import brotli
+except ImportError:  # Brotli is optional; gzip is always available
+    brotli = None
+
+COMPRESSIBLE_MIMETYPES = {
+    'text/html',
+    'text/css',
+    'text/plain',
+    'text/xml',
+    'application/json',
+    'application/javascript',
+    'application/xml',
+    'application/atom+xml',
+    'application/rss+xml',
+    'image/svg+xml',
+}
+
+
+def encoded_etag(etag, coding):
+    """ETag of the ``coding``-encoded representation of an entity"""
+    return f"{etag}-{coding}"
+
+
+def codings():
+    """Content-codings this process can produce, in order of preference"""
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+class Compressor:
+    """after_request hook that negotiates and applies response compression"""
+
+    def __init__(self, app=None):
+        self.min_size = 500
+        self.level = 6
+        self.br_quality = 5
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('COMPRESS_MIN_SIZE', 500)
+        app.config.setdefault('COMPRESS_LEVEL', 6)
+        app.config.setdefault('COMPRESS_BR_QUALITY', 5)
+        self.min_size = app.config['COMPRESS_MIN_SIZE']
+        self.level = app.config['COMPRESS_LEVEL']
+        self.br_quality = app.config['COMPRESS_BR_QUALITY']
+        app.after_request(self.after_request)
+
+    def negotiate(self):
+        """Best content-coding the client accepts, or None"""
+        accepted = request.accept_encodings
+        candidates = [coding for coding in codings() if accepted[coding]]
+        if not candidates:
+            return None
+        return max(candidates, key=lambda coding: accepted[coding])
+
+    def after_request(self, response):
+        if (response.status_code < 200 or response.status_code in (204, 206, 304)
+                or response.direct_passthrough
+                or 'Content-Encoding' in response.headers
+                or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+            return response
+
+        response.vary.add('Accept-Encoding')
+        coding = self.negotiate()
+        if coding is None:
+            return response
+
+        if response.is_streamed:
+            response.response = self.stream(response.response, coding)
+            response.headers.pop('Content-Length', None)
+        else:
+            body = response.get_data()
+            if len(body) < self.min_size:
+                return response
+            response.set_data(self.compressed_body(body, coding))
+
+        response.headers['Content-Encoding'] = coding
+        etag, weak = response.get_etag()
+        if etag:
+            response.set_etag(encoded_etag(etag, coding), weak=weak)
+        return response
+
+    def compressed_body(self, body, coding):
+        """Compress ``body``, reusing the variant stored on a page cache entry"""
+        entry = g.get('page_cache_entry')
+        if entry is not None and entry.body == body:
+            if coding not in entry.variants:
+                entry.variants[coding] = self.compress(body, coding)
+            return entry.variants[coding]
+        return self.compress(body, coding)
+
+    def compress(self, data, coding):
+        if coding == 'br':
+            return brotli.compress(data, quality=self.br_quality)
+        compressor = zlib.compressobj(self.level, zlib.DEFLATED, 31)
+        return compressor.compress(data) + compressor.flush()
+
+    def stream(self, chunks, coding):
+        """Compress an iterable of chunks, flushing after each one"""
+        try:
+            yield from self._stream(chunks, coding)
+        finally:
+            # Keep the close() contract of the wrapped iterable (stream_with_context)
+            close = getattr(chunks, 'close', None)
+            if close is not None:
+                close()
+
+    def _stream(self, chunks, coding):
+        if coding == 'br':
+            compressor = brotli.Compressor(quality=self.br_quality)
+            for chunk in chunks:
+                if isinstance(chunk, str):
+                    chunk = chunk.encode()
+                data = compressor.process(chunk) + compressor.flush()
+                if data:
+                    yield data
+            yield compressor.finish()
+            return
+
+        compressor = zlib.compressobj(self.level, zlib.DEFLATED, 31)
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode()
+            data = compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+            if data:
+                yield data
+        yield compressor.flush()
@@ -0,0 +1,94 @@
+"""
+Conditional GET support for the Portfolio Website
+
+Views decorated with :func:`conditional` declare a cheap validator
+function. It runs before the view, so a matching ``If-None-Match`` or
+``If-Modified-Since`` is answered with a 304 without rendering a template
+or loading post bodies.
+"""
+
+import hashlib
+import os
+from functools import wraps
+
+from flask import current_app, make_response, request, session
+
+from compression import codings, encoded_etag
+
+_template_version = None
+
+
+def template_version():
+    """Digest of every template, so a deploy that changes markup changes ETags"""
+    global _template_version
+    if _template_version is None:
+        digest = hashlib.sha1()
+        folder = os.path.join(current_app.root_path, current_app.template_folder)
+        for dirpath, dirnames, filenames in os.walk(folder):
+            dirnames.sort()
+            for filename in sorted(filenames):
+                with open(os.path.join(dirpath, filename), 'rb') as f:
+                    digest.update(filename.encode())
+                    digest.update(f.read())
+        _template_version = digest.hexdigest()
+    return _template_version
+
+
+def make_etag(*parts):
+    """Build a strong ETag from the template and asset versions, URL and ``parts``"""
+    digest = hashlib.sha1(template_version().encode())
+    digest.update(current_app.config.get('ASSET_VERSION', '').encode())
+    digest.update(request.full_path.encode())
+    for part in parts:
+        digest.update(b'\0' + str(part).encode())
+    return digest.hexdigest()
+
+
+def _matches(etag, last_modified):
+    if request.if_none_match:
+        # Compressed representations carry a coding suffix on the same ETag
+        candidates = [etag] + [encoded_etag(etag, coding) for coding in codings()]
+        return any(request.if_none_match.contains(candidate) for candidate in candidates)
+    if request.if_modified_since and last_modified:
+        return last_modified.replace(microsecond=0) <= request.if_modified_since.replace(tzinfo=None)
+    return False
+
+
+def _add_validators(response, etag, last_modified):
+    response.set_etag(etag)
+    if last_modified:
+        response.last_modified = last_modified
+    # Always revalidate: the page is cheap to check and may change any time
+    response.cache_control.no_cache = True
+    return response
+
+
+def conditional(validator):
+    """Decorator answering conditional GETs from ``validator(**view_args)``.
+
+    ``validator`` returns ``(etag_parts, last_modified)`` or ``None`` when no
+    validator applies (for example a missing post, which the view turns into
+    a 404). ``last_modified`` is a naive UTC datetime.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            # Pages carrying a flash message are one-offs and must not be revalidated
+            if request.method != 'GET' or '_flashes' in session:
+                return view(*args, **kwargs)
+
+            validators = validator(**kwargs)
+            if validators is None:
+                return view(*args, **kwargs)
+            etag_parts, last_modified = validators
+            etag = make_etag(*etag_parts)
+
+            if _matches(etag, last_modified):
+                return _add_validators(make_response('', 304), etag, last_modified)
+
+            response = make_response(view(*args, **kwargs))
+            if response.status_code == 200 and not session.modified:
+                _add_validators(response, etag, last_modified)
+            return response
+        return wrapper
+    return decorator
@@ -3,20 +3,112 @@ Configuration settings for the Portfolio Website
 """
 
 import os
+import secrets
 from datetime import timedelta
 
+
+def _normalize_database_url(url):
+    # Handle Railway PostgreSQL URL format
+    if url.startswith('postgres://'):
+        url = url.replace('postgres://', 'postgresql://', 1)
+    return url
+
+
+def _database_url():
+    return _normalize_database_url(os.environ.get('DATABASE_URL') or 'sqlite:///portfolio.db')
+
+
+def _replica_urls():
+    urls = os.environ.get('DATABASE_REPLICA_URLS', '')
+    return [_normalize_database_url(url.strip()) for url in urls.split(',') if url.strip()]
+
+
+def _flag(name, default):
+    return os.environ.get(name, str(default)).lower() in ['true', 'on', '1']
+
+
 class Config:
     """Base configuration class"""
     
     # Basic Flask configuration
-    SECRET_KEY = os.environ.get('SECRET_KEY') or 'dev-secret-key-change-in-production'
+    SECRET_KEY = os.environ.get('SECRET_KEY') or secrets.token_hex(32)
+    SERVER_NAME = os.environ.get('SERVER_NAME')
+    PREFERRED_URL_SCHEME = os.environ.get('PREFERRED_URL_SCHEME', 'https')
     
     # Database configuration
-    SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or 'sqlite:///portfolio.db'
+    SQLALCHEMY_DATABASE_URI = _database_url()
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+    # Optional read replicas (comma-separated URLs), see replicas.py
+    DATABASE_REPLICA_URLS = _replica_urls()
+    REPLICA_PIN_SECONDS = float(os.environ.get('REPLICA_PIN_SECONDS', 5))
+    REPLICA_CHECK_SECONDS = float(os.environ.get('REPLICA_CHECK_SECONDS', 10))
+
+    # Engine tuning per backend, see engine_profiles.py ("default" disables it)
+    DATABASE_PROFILE = os.environ.get('DATABASE_PROFILE', 'tuned').lower()
+    SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 5000))
+    SQLITE_CACHE_SIZE_KB = int(os.environ.get('SQLITE_CACHE_SIZE_KB', 16384))
+    SQLITE_MMAP_SIZE = int(os.environ.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024))
+    DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 5))
+    DB_MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW', 5))
+    DB_POOL_TIMEOUT = int(os.environ.get('DB_POOL_TIMEOUT', 10))
+    DB_POOL_RECYCLE = int(os.environ.get('DB_POOL_RECYCLE', 1800))
+    DB_STATEMENT_TIMEOUT_MS = int(os.environ.get('DB_STATEMENT_TIMEOUT_MS', 15000))
+    DB_PREPARE_THRESHOLD = int(os.environ.get('DB_PREPARE_THRESHOLD', 5))
     
     # Application settings
-    POSTS_PER_PAGE = 10
+    POSTS_PER_PAGE = int(os.environ.get('POSTS_PER_PAGE', 10))
+
+    # Caching and compression
+    PAGE_CACHE_SIZE = int(os.environ.get('PAGE_CACHE_SIZE', 64))
+    PAGE_CACHE_TTL = int(os.environ.get('PAGE_CACHE_TTL', 300))
+    FRAGMENT_CACHE_BYTES = int(os.environ.get('FRAGMENT_CACHE_BYTES', 8 * 1024 * 1024))
+    COMPRESS_MIN_SIZE = int(os.environ.get('COMPRESS_MIN_SIZE', 500))
+    COMPRESS_LEVEL = int(os.environ.get('COMPRESS_LEVEL', 6))
+    COMPRESS_BR_QUALITY = int(os.environ.get('COMPRESS_BR_QUALITY', 5))
+
+    # Shared cache for post rows and fragments, see object_cache.py
+    OBJECT_CACHE_BACKEND = os.environ.get('OBJECT_CACHE_BACKEND', 'sqlite').lower()
+    OBJECT_CACHE_TTL = int(os.environ.get('OBJECT_CACHE_TTL', 300))
+    OBJECT_CACHE_NEGATIVE_TTL = int(os.environ.get('OBJECT_CACHE_NEGATIVE_TTL', 60))
+    OBJECT_CACHE_SIZE = int(os.environ.get('OBJECT_CACHE_SIZE', 1024))
+    OBJECT_CACHE_PATH = os.environ.get('OBJECT_CACHE_PATH')
+    OBJECT_CACHE_REDIS_URL = (os.environ.get('OBJECT_CACHE_REDIS_URL')
+                              or os.environ.get('REDIS_URL', 'redis://localhost:6379/0'))
+
+    # Static export target; when set, publishing rebuilds the affected pages
+    FREEZE_DIR = os.environ.get('FREEZE_DIR')
+    FREEZE_PRECOMPRESS = _flag('FREEZE_PRECOMPRESS', False)
+
+    # Public address used in /feed.xml and /sitemap.xml, which are stored
+    # in FEEDS_DIR (instance/feeds by default), see feeds.py
+    SITE_URL = (os.environ.get('SITE_URL') or os.environ.get('RENDER_EXTERNAL_URL')
+                or (os.environ.get('RAILWAY_PUBLIC_DOMAIN') and
+                    f"https://{os.environ['RAILWAY_PUBLIC_DOMAIN']}"))
+    FEEDS_DIR = os.environ.get('FEEDS_DIR')
+    FEED_SIZE = int(os.environ.get('FEED_SIZE', 20))
+    SITEMAP_SHARD_SIZE = int(os.environ.get('SITEMAP_SHARD_SIZE', 50000))
+
+    # Background jobs, see jobs.py (JOBS_WORKERS=0 leaves them to `setup.py run-jobs`)
+    JOBS_WORKERS = int(os.environ.get('JOBS_WORKERS', 2))
+    JOBS_MAX_ATTEMPTS = int(os.environ.get('JOBS_MAX_ATTEMPTS', 5))
+    JOBS_RETRY_SECONDS = int(os.environ.get('JOBS_RETRY_SECONDS', 10))
+    JOBS_LEASE_SECONDS = int(os.environ.get('JOBS_LEASE_SECONDS', 300))
+    JOBS_POLL_SECONDS = float(os.environ.get('JOBS_POLL_SECONDS', 5))
+
+    # Compiled templates are kept on disk (instance/jinja-cache by default)
+    # and optionally all compiled when the app is created
+    JINJA_BYTECODE_CACHE = _flag('JINJA_BYTECODE_CACHE', True)
+    JINJA_CACHE_DIR = os.environ.get('JINJA_CACHE_DIR')
+    TEMPLATE_WARMUP = _flag('TEMPLATE_WARMUP', True)
+
+    # Instrumentation
+    READINESS_CACHE_SECONDS = float(os.environ.get('READINESS_CACHE_SECONDS', 5))
+    SLOW_QUERY_MS = int(os.environ.get('SLOW_QUERY_MS', 200))
+    SERVER_TIMING = _flag('SERVER_TIMING', True)
+    METRICS_DIR = os.environ.get('METRICS_DIR')
+    # Answer 404s for scanner paths (.php, wp-admin, dotfiles) before other hooks
+    ERROR_PROBE_FAST_PATH = _flag('ERROR_PROBE_FAST_PATH', True)
     
     # Security settings
     PERMANENT_SESSION_LIFETIME = timedelta(days=7)
@@ -42,25 +134,42 @@ class DevelopmentConfig(Config):
     """Development environment configuration"""
     DEBUG = True
     DEVELOPMENT = True
+    # Templates are edited while the server runs
+    TEMPLATE_WARMUP = _flag('TEMPLATE_WARMUP', False)
     
 class ProductionConfig(Config):
     """Production environment configuration"""
     DEBUG = False
     DEVELOPMENT = False
-    
-    # Use stronger secret key in production
-    SECRET_KEY = os.environ.get('SECRET_KEY') or 'you-must-set-a-secret-key-in-production'
 
 class TestingConfig(Config):
     """Testing environment configuration"""
     TESTING = True
     SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+    DATABASE_REPLICA_URLS = []
     WTF_CSRF_ENABLED = False
+    PAGE_CACHE_SIZE = 0
+    FRAGMENT_CACHE_BYTES = 0
+    OBJECT_CACHE_BACKEND = 'memory'
+    JOBS_WORKERS = 0
+    JINJA_BYTECODE_CACHE = False
+    TEMPLATE_WARMUP = False
+
+def config_name(default='production'):
+    """Configuration to use when none is given explicitly"""
+    name = os.environ.get('FLASK_CONFIG') or os.environ.get('FLASK_ENV')
+    if name:
+        return name
+    # Hosted platforms run production even from a launcher that asks for development
+    if os.environ.get('RAILWAY_ENVIRONMENT') or os.environ.get('RENDER') or os.environ.get('PORT'):
+        return 'production'
+    return default
 
 # Configuration dictionary
 config = {
     'development': DevelopmentConfig,
     'production': ProductionConfig,
     'testing': TestingConfig,
-    'default': DevelopmentConfig
+    # gunicorn and other importers of app:app; local launchers opt into development
+    'default': ProductionConfig
 }
\ No newline at end of file
@@ -0,0 +1,104 @@
+"""
+Database engine profiles for the Portfolio Website
+
+The backend named by DATABASE_URL picks a profile:
+
+* SQLite runs in WAL mode with ``synchronous=NORMAL``, a memory-mapped
+  file, a larger page cache and a busy timeout, so readers keep reading
+  while a post is being written.
+* PostgreSQL gets a sized pool that pings connections before use and
+  recycles them, a per-statement timeout and, with psycopg 3, server-side
+  prepared statements.
+
+``DATABASE_PROFILE=default`` turns the tuning off (SQLAlchemy defaults).
+"""
+
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+
+
+def _sqlite_in_memory(url):
+    return url.database in (None, '', ':memory:') or url.query.get('mode') == 'memory'
+
+
+def engine_options(database_url, config):
+    """SQLALCHEMY_ENGINE_OPTIONS for ``database_url``"""
+    if config['DATABASE_PROFILE'] != 'tuned':
+        return {}
+    url = make_url(database_url)
+    backend = url.get_backend_name()
+    if backend == 'sqlite':
+        # The driver's own lock wait, in seconds; the pragma below sets the same
+        return {'connect_args': {'timeout': config['SQLITE_BUSY_TIMEOUT_MS'] / 1000}}
+    if backend == 'postgresql':
+        connect_args = {
+            'options': f"-c statement_timeout={config['DB_STATEMENT_TIMEOUT_MS']}",
+        }
+        if url.get_driver_name() == 'psycopg':
+            # psycopg 3 prepares a statement server-side after this many executions
+            connect_args['prepare_threshold'] = config['DB_PREPARE_THRESHOLD']
+        return {
+            'pool_size': config['DB_POOL_SIZE'],
+            'max_overflow': config['DB_MAX_OVERFLOW'],
+            'pool_timeout': config['DB_POOL_TIMEOUT'],
+            # Workers are recycled every max_requests; connections go stale
+            # across server restarts and idle timeouts in between.
+            'pool_pre_ping': True,
+            'pool_recycle': config['DB_POOL_RECYCLE'],
+            # Reuse the most recent connection so idle extras can time out
+            'pool_use_lifo': True,
+            'connect_args': connect_args,
+        }
+    return {}
+
+
+def sqlite_pragmas(url, config):
+    """PRAGMA statements run on every new SQLite connection"""
+    pragmas = [
+        f"PRAGMA busy_timeout = {config['SQLITE_BUSY_TIMEOUT_MS']}",
+        # Negative values are KiB rather than pages
+        f"PRAGMA cache_size = -{config['SQLITE_CACHE_SIZE_KB']}",
+        'PRAGMA temp_store = MEMORY',
+    ]
+    if not _sqlite_in_memory(url):
+        pragmas += [
+            # Readers see the last committed snapshot instead of waiting on writers
+            'PRAGMA journal_mode = WAL',
+            # Safe with WAL: a power loss can only roll back the last commits
+            'PRAGMA synchronous = NORMAL',
+            f"PRAGMA mmap_size = {config['SQLITE_MMAP_SIZE']}",
+        ]
+    return pragmas
+
+
+def apply_engine_profile(engine, config):
+    """Install per-connection settings that engine options cannot express"""
+    if config['DATABASE_PROFILE'] != 'tuned' or engine.dialect.name != 'sqlite':
+        return
+    pragmas = sqlite_pragmas(engine.url, config)
+
+    @event.listens_for(engine, 'connect')
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for pragma in pragmas:
+                cursor.execute(pragma)
+        finally:
+            cursor.close()
+
+
+def describe(engine):
+    """Effective settings of ``engine`` (used by the benchmarks)"""
+    if engine.dialect.name == 'sqlite':
+        with engine.connect() as connection:
+            return {
+                name: connection.exec_driver_sql(f'PRAGMA {name}').scalar()
+                for name in ('journal_mode', 'synchronous', 'mmap_size',
+                             'cache_size', 'busy_timeout')
+            }
+    pool = engine.pool
+    return {
+        'pool': type(pool).__name__,
+        'size': pool.size() if hasattr(pool, 'size') else None,
+        'checked_out': pool.checkedout() if hasattr(pool, 'checkedout') else None,
+    }
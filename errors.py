@@ -0,0 +1,136 @@
+"""
+Error pages for the Portfolio Website
+
+404 and 500 responses come from the small standalone ``error.html``. Each
+page is rendered once per worker, the first time it is needed, and kept
+as bytes together with its brotli and gzip encodings, so every later
+error is a dictionary lookup with no template or database work.
+
+Vulnerability scanners request thousands of paths like ``/wp-login.php``
+or ``/.env``. When no route matches and the path looks like such a probe,
+a before_request hook registered ahead of all others answers with a
+short plain-text 404, so none of the other request hooks run.
+
+Errors are counted in ``/metrics`` as ``http_errors_total`` by status and
+path prefix. The prefix is ``probe:<pattern>`` for scans, the first path
+segment when the app has routes under it, and ``other`` otherwise.
+Scanners therefore cannot grow the label set.
+"""
+
+import gzip
+import re
+import threading
+
+from flask import current_app, render_template, request
+
+from compression import codings
+
+try:
+    import brotli
+except ImportError:  # Brotli is optional; gzip variants are always built
+    brotli = None
+
+# Paths no page of this site will ever have
+PROBE_PATTERNS = {
+    'php': r'\.(php\d?|phtml)(/|$)',
+    'wordpress': r'/(wp-[a-z]+|wordpress|xmlrpc)',
+    'dotfile': r'/\.(?!well-known/)',
+    'admin': r'^/(phpmyadmin|pma|myadmin|cgi-bin|administrator|manager|actuator|boaform|hnap1|solr)',
+    'script': r'\.(aspx?|jsp|cgi|pl|sh|env|bak|old|sql|ini|log|ya?ml|conf|swp|tar|zip|7z|rar)$',
+}
+
+MESSAGES = {
+    404: ('Page not found', "The page you are looking for doesn't exist or has moved."),
+    500: ('Server error', 'Something went wrong on our side. Please try again in a moment.'),
+}
+PROBE_BODY = b'Not Found\n'
+
+
+class ErrorPages:
+    """Prerendered error responses, a fast path for scanner probes and error counters"""
+
+    def __init__(self, app=None):
+        self._pages = {}
+        self._lock = threading.Lock()
+        self._route_prefixes = None
+        self.probe = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('ERROR_PROBE_FAST_PATH', True)
+        app.config.setdefault('ERROR_PROBE_PATTERNS', PROBE_PATTERNS)
+        self.probe = re.compile('|'.join(
+            f'(?P<{name}>{pattern})' for name, pattern in app.config['ERROR_PROBE_PATTERNS'].items()),
+            re.IGNORECASE)
+        if app.config['ERROR_PROBE_FAST_PATH']:
+            # Call init_app before the other extensions so this runs first
+            app.before_request(self._probe_fast_path)
+        app.extensions['error_pages'] = self
+
+    # Responses
+
+    def response(self, status):
+        """The prerendered error page for ``status``, in the best encoding the client accepts"""
+        page = self._page(status)
+        accepted = request.accept_encodings
+        candidates = [coding for coding in codings() if accepted[coding] and coding in page]
+        coding = max(candidates, key=lambda coding: accepted[coding]) if candidates else None
+        response = current_app.response_class(page[coding or 'identity'], status=status,
+                                              mimetype='text/html')
+        if coding:
+            response.headers['Content-Encoding'] = coding
+        response.vary.add('Accept-Encoding')
+        self.count(status)
+        return response
+
+    def _page(self, status):
+        page = self._pages.get(status)
+        if page is None:
+            with self._lock:
+                page = self._pages.get(status)
+                if page is None:
+                    page = self._pages[status] = self.prerender(status)
+        return page
+
+    def prerender(self, status):
+        """Render the page for ``status`` and encode it once, at the highest settings"""
+        title, message = MESSAGES[status]
+        body = render_template('error.html', status=status, title=title, message=message).encode()
+        page = {'identity': body, 'gzip': gzip.compress(body, compresslevel=9, mtime=0)}
+        if brotli is not None:
+            page['br'] = brotli.compress(body, quality=11)
+        return page
+
+    def _probe_fast_path(self):
+        if request.url_rule is not None:
+            return None
+        match = self.probe.search(request.path)
+        if match is None:
+            return None
+        self.count(404, f'probe:{match.lastgroup}')
+        return current_app.response_class(PROBE_BODY, status=404, mimetype='text/plain')
+
+    # Counters
+
+    def prefix(self, path):
+        """Bounded label for ``path``"""
+        match = self.probe.search(path)
+        if match is not None:
+            return f'probe:{match.lastgroup}'
+        if self._route_prefixes is None:
+            # Routes are registered after init_app, so this is built on first use
+            self._route_prefixes = {rule.rule.split('/')[1] for rule in
+                                    current_app.url_map.iter_rules()
+                                    if not rule.rule.split('/')[1].startswith('<')}
+        segment = path.split('/')[1] if path.count('/') else ''
+        return f'/{segment}' if segment in self._route_prefixes else 'other'
+
+    def count(self, status, prefix=None):
+        # Requests the app makes to itself (static export) are not traffic
+        if request.environ.get('portfolio.internal'):
+            return
+        metrics = current_app.extensions.get('metrics')
+        if metrics is not None:
+            metrics.increment('http_errors_total', status=status,
+                              prefix=prefix or self.prefix(request.path))
@@ -0,0 +1,371 @@
+"""
+Atom feed and sitemap for the Portfolio Website
+
+``/feed.xml`` (the newest ``FEED_SIZE`` posts) and ``/sitemap.xml`` are
+built once, stored in the instance folder (``FEEDS_DIR``) and patched as
+posts are published: new entries are merged into the feed and new URLs
+appended to the last sitemap shard. Requests only check the newest post
+id against the stored state and then send the file, with ETag and
+Last-Modified, so feed readers and crawlers mostly get 304s.
+
+Past ``SITEMAP_SHARD_SIZE`` URLs (50,000, the protocol's limit) the
+sitemap is split into ``/sitemap-<n>.xml`` shards and ``/sitemap.xml``
+becomes a sitemap index. Both files are shared by every worker on the
+node; a worker that finds them behind the database catches up itself, so
+bulk imports and other nodes' publishes show up without a rebuild.
+
+Feed and sitemap URLs are absolute, so ``SITE_URL`` should be set to the
+public address of the site; the request's Host header is never used.
+"""
+
+import copy
+import gzip
+import json
+import os
+import threading
+from contextlib import contextmanager
+from xml.sax.saxutils import escape, quoteattr
+
+from flask import abort, current_app, request, send_file, url_for
+
+try:
+    import fcntl
+except ImportError:  # Not on Windows; a process-local lock is enough there
+    fcntl = None
+
+# Bump when the stored layout or the markup changes to force a rebuild
+FORMAT_VERSION = 2
+STATE_NAME = 'state.json'
+# Argument-free pages listed in the sitemap ahead of the posts
+SITEMAP_ENDPOINTS = ['home', 'about', 'experience', 'projects', 'contact', 'blog', 'blog_archive']
+
+ATOM_TYPE = 'application/atom+xml'
+SITEMAP_TYPE = 'application/xml'
+URLSET_OPEN = '<?xml version="1.0" encoding="UTF-8"?>\n' \
+              '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
+URLSET_CLOSE = '</urlset>\n'
+
+
+def _timestamp(value):
+    """W3C datetime for a naive UTC datetime (or None)"""
+    return value.strftime('%Y-%m-%dT%H:%M:%SZ') if value else None
+
+
+def _url_entry(loc, lastmod):
+    if lastmod:
+        return f'<url><loc>{escape(loc)}</loc><lastmod>{lastmod}</lastmod></url>\n'
+    return f'<url><loc>{escape(loc)}</loc></url>\n'
+
+
+class Feeds:
+    """Stores /feed.xml and /sitemap.xml and keeps them in step with the posts"""
+
+    def __init__(self, app=None):
+        self.loaders = {}
+        self.directory = None
+        self._thread_lock = threading.Lock()
+        self._state = None
+        self._state_mtime = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('SITE_URL', None)
+        app.config.setdefault('FEEDS_DIR', None)
+        app.config.setdefault('FEED_SIZE', 20)
+        app.config.setdefault('SITEMAP_SHARD_SIZE', 50000)
+        app.config.setdefault('FEEDS_MAX_AGE', 300)
+        self.directory = app.config['FEEDS_DIR'] or os.path.join(app.instance_path, 'feeds')
+        os.makedirs(self.directory, exist_ok=True)
+        app.extensions['feeds'] = self
+        app.add_url_rule('/feed.xml', 'feed', self.feed)
+        app.add_url_rule('/sitemap.xml', 'sitemap', self.sitemap)
+        app.add_url_rule('/sitemap-<int:number>.xml', 'sitemap_shard', self.sitemap_shard)
+
+    def loader(self, name):
+        """Decorator registering a data source.
+
+        ``newest_id()`` returns the highest post id, ``feed_posts(limit, after_id)``
+        the newest posts with an id above ``after_id`` as dicts, ``feed_post(id)``
+        one such dict (or None), and ``sitemap_posts(after_id)``
+        ``(id, date_updated)`` rows in id order.
+        """
+        def decorator(fn):
+            self.loaders[name] = fn
+            return fn
+        return decorator
+
+    # Stored state
+
+    def _path(self, name):
+        return os.path.join(self.directory, name)
+
+    @contextmanager
+    def _lock(self):
+        # Serializes builds across threads and the workers sharing the folder
+        with self._thread_lock, open(self._path('.lock'), 'w') as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            yield
+
+    def _write(self, name, data, precompress=True):
+        path = self._path(name)
+        variants = [('', data)]
+        if precompress:
+            variants.append(('.gz', gzip.compress(data, compresslevel=9, mtime=0)))
+        for suffix, body in variants:
+            tmp = f'{path}{suffix}.{os.getpid()}.tmp'
+            with open(tmp, 'wb') as f:
+                f.write(body)
+            os.replace(tmp, path + suffix)
+
+    def load_state(self):
+        """The stored state, re-read only when another worker has replaced it"""
+        try:
+            mtime = os.stat(self._path(STATE_NAME)).st_mtime_ns
+        except OSError:
+            return None
+        if mtime != self._state_mtime:
+            try:
+                with open(self._path(STATE_NAME)) as f:
+                    self._state = json.load(f)
+            except (OSError, ValueError):
+                return None
+            self._state_mtime = mtime
+        return self._state
+
+    def _save_state(self, state):
+        self._write(STATE_NAME, json.dumps(state).encode(), precompress=False)
+        self._state = state
+        self._state_mtime = os.stat(self._path(STATE_NAME)).st_mtime_ns
+
+    # Building and patching
+
+    def base_url(self, app):
+        base = app.config['SITE_URL']
+        if not base:
+            server_name = app.config.get('SERVER_NAME') or 'localhost:8000'
+            base = f"{app.config.get('PREFERRED_URL_SCHEME', 'http')}://{server_name}"
+        return base.rstrip('/')
+
+    def _compatible(self, state, app):
+        return (state is not None and state['version'] == FORMAT_VERSION
+                and state['base_url'] == self.base_url(app)
+                and state['shard_size'] == app.config['SITEMAP_SHARD_SIZE'])
+
+    def is_current(self, state, app):
+        return (self._compatible(state, app)
+                and state['last_id'] >= (self.loaders['newest_id']() or 0))
+
+    def refresh(self, app, rebuild=False):
+        """Bring the stored files up to date; return False if that failed.
+
+        Publishing only adds posts, so anything newer than the stored
+        ``last_id`` is merged in; a changed base URL, shard size or format
+        (or ``rebuild``) writes everything from scratch.
+        """
+        try:
+            # The common case: one indexed MAX(id) and a stat() of the state file
+            if not rebuild and self.is_current(self.load_state(), app):
+                return True
+            # URLs are built against SITE_URL, never the current request's host
+            with self._lock(), app.test_request_context(base_url=self.base_url(app)):
+                state = self.load_state()
+                if rebuild or not self._compatible(state, app):
+                    self._build(app)
+                elif not self.is_current(state, app):
+                    # Patched on a copy, so a failure leaves the loaded state intact
+                    self._patch(app, copy.deepcopy(state))
+            return True
+        except Exception:
+            app.logger.exception('Could not update the feed and sitemap')
+            return False
+
+    def refresh_post(self, app, post_id):
+        """Like refresh(), then re-read the feed entry of ``post_id`` if it has one.
+
+        A request can merge a post into the feed before its HTML is rendered;
+        the render job calls this afterwards so the entry gets its content.
+        """
+        if not self.refresh(app):
+            return False
+        try:
+            with self._lock(), app.test_request_context(base_url=self.base_url(app)):
+                state = self.load_state()
+                if state is None or all(entry['id'] != post_id for entry in state['entries']):
+                    return True
+                post = self.loaders['feed_post'](post_id)
+                state = copy.deepcopy(state)
+                state['entries'] = [entry for entry in state['entries'] if entry['id'] != post_id]
+                if post is not None:
+                    state['entries'].append(self._feed_entry(state['base_url'], post))
+                    state['entries'].sort(key=lambda entry: (entry['published'], entry['id']),
+                                          reverse=True)
+                self._write('feed.xml', self.render_feed(app, state).encode())
+                self._save_state(state)
+            return True
+        except Exception:
+            app.logger.exception('Could not update the feed entry for post %s', post_id)
+            return False
+
+    def _build(self, app):
+        base = self.base_url(app)
+        state = {
+            'version': FORMAT_VERSION,
+            'base_url': base,
+            'shard_size': app.config['SITEMAP_SHARD_SIZE'],
+            'last_id': 0,
+            'entries': [],
+            'shards': [],
+        }
+        pages = [(base + url_for(endpoint), None) for endpoint in SITEMAP_ENDPOINTS
+                 if endpoint in app.view_functions]
+        self._patch(app, state, pages)
+        # A smaller archive than last time leaves shards past the new end
+        for name in os.listdir(self.directory):
+            if name.startswith('sitemap-') and name.split('.')[0][8:].isdigit():
+                if int(name.split('.')[0][8:]) > len(state['shards']):
+                    os.remove(self._path(name))
+
+    def _patch(self, app, state, pages=()):
+        """Merge posts newer than ``state['last_id']`` into the feed and sitemap"""
+        base = self.base_url(app)
+        after_id = state['last_id']
+
+        new_entries = [self._feed_entry(base, post) for post in
+                       self.loaders['feed_posts'](app.config['FEED_SIZE'], after_id)]
+        entries = sorted(state['entries'] + new_entries,
+                         key=lambda entry: (entry['published'], entry['id']), reverse=True)
+        state['entries'] = entries[:app.config['FEED_SIZE']]
+
+        def urls():
+            yield from pages
+            for post_id, date_updated in self.loaders['sitemap_posts'](after_id):
+                state['last_id'] = max(state['last_id'], post_id)
+                yield (base + url_for('blog_post', post_id=post_id), _timestamp(date_updated))
+
+        self._extend_sitemap(state, urls())
+        self._write('feed.xml', self.render_feed(app, state).encode())
+        self._write_index(state)
+        self._save_state(state)
+
+    def _feed_entry(self, base, post):
+        return {
+            'id': post['id'],
+            'title': post['title'],
+            'url': base + url_for('blog_post', post_id=post['id']),
+            'published': _timestamp(post['date_posted']),
+            'updated': _timestamp(post['date_updated'] or post['date_posted']),
+            'summary': post['excerpt'] or '',
+            'content': post['content_html'] or '',
+        }
+
+    def render_feed(self, app, state):
+        base = state['base_url']
+        entries = state['entries']
+        updated = max((entry['updated'] for entry in entries), default=None) \
+            or '1970-01-01T00:00:00Z'
+        parts = [
+            '<?xml version="1.0" encoding="UTF-8"?>\n',
+            '<feed xmlns="http://www.w3.org/2005/Atom">\n',
+            f"<title>{escape(app.config.get('SITE_TITLE', 'Blog'))}</title>\n",
+            f'<id>{escape(base)}/</id>\n',
+            f"<link rel=\"self\" href={quoteattr(base + url_for('feed'))}/>\n",
+            f"<link rel=\"alternate\" type=\"text/html\" href={quoteattr(base + url_for('blog'))}/>\n",
+            f'<updated>{updated}</updated>\n',
+            f"<author><name>{escape(app.config.get('AUTHOR_NAME', ''))}</name></author>\n",
+        ]
+        for entry in entries:
+            parts.append(
+                '<entry>\n'
+                f"<id>{escape(entry['url'])}</id>\n"
+                f"<title>{escape(entry['title'])}</title>\n"
+                f"<link rel=\"alternate\" type=\"text/html\" href={quoteattr(entry['url'])}/>\n"
+                f"<published>{entry['published']}</published>\n"
+                f"<updated>{entry['updated']}</updated>\n"
+                f"<summary>{escape(entry['summary'])}</summary>\n"
+                f"<content type=\"html\">{escape(entry['content'])}</content>\n"
+                '</entry>\n')
+        parts.append('</feed>\n')
+        return ''.join(parts)
+
+    def _extend_sitemap(self, state, urls):
+        """Append ``(loc, lastmod)`` pairs to the last shard, opening new ones as they fill"""
+        shards = state['shards']
+        if not shards:
+            shards.append({'count': 0, 'lastmod': None})
+        pending = []
+        for loc, lastmod in urls:
+            if shards[-1]['count'] + len(pending) >= state['shard_size']:
+                self._append_to_shard(state, pending)
+                shards.append({'count': 0, 'lastmod': None})
+                pending = []
+            pending.append(_url_entry(loc, lastmod))
+            if lastmod and (shards[-1]['lastmod'] or '') < lastmod:
+                shards[-1]['lastmod'] = lastmod
+        self._append_to_shard(state, pending)
+
+    def _append_to_shard(self, state, lines):
+        shard = state['shards'][-1]
+        name = f"sitemap-{len(state['shards'])}.xml"
+        if shard['count'] == 0:
+            body = URLSET_OPEN + ''.join(lines) + URLSET_CLOSE
+        elif lines:
+            with open(self._path(name), encoding='utf-8') as f:
+                existing = f.read()
+            body = existing[:existing.rindex(URLSET_CLOSE)] + ''.join(lines) + URLSET_CLOSE
+        else:
+            return
+        self._write(name, body.encode())
+        shard['count'] += len(lines)
+
+    def _write_index(self, state):
+        shards = state['shards']
+        if len(shards) == 1:
+            # Small archives need no index: /sitemap.xml is the one shard
+            with open(self._path('sitemap-1.xml'), 'rb') as f:
+                self._write('sitemap.xml', f.read())
+            return
+        parts = ['<?xml version="1.0" encoding="UTF-8"?>\n',
+                 '<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n']
+        for number, shard in enumerate(shards, 1):
+            loc = escape(f"{state['base_url']}/sitemap-{number}.xml")
+            lastmod = f"<lastmod>{shard['lastmod']}</lastmod>" if shard['lastmod'] else ''
+            parts.append(f'<sitemap><loc>{loc}</loc>{lastmod}</sitemap>\n')
+        parts.append('</sitemapindex>\n')
+        self._write('sitemap.xml', ''.join(parts).encode())
+
+    def shard_urls(self):
+        """Paths of the sitemap shards, when /sitemap.xml is an index"""
+        state = self.load_state()
+        if state is None or len(state['shards']) < 2:
+            return []
+        return [f'/sitemap-{number}.xml' for number in range(1, len(state['shards']) + 1)]
+
+    # Views
+
+    def serve(self, name, mimetype):
+        """Send a stored file with validators, preferring its gzip variant"""
+        app = current_app._get_current_object()
+        refreshed = self.refresh(app)
+        if not os.path.exists(self._path(name)):
+            abort(404 if refreshed else 503)
+        filename = name
+        if request.accept_encodings['gzip'] and os.path.isfile(self._path(name + '.gz')):
+            filename = name + '.gz'
+        response = send_file(self._path(filename), mimetype=mimetype, conditional=True,
+                             max_age=app.config['FEEDS_MAX_AGE'])
+        if filename != name:
+            response.headers['Content-Encoding'] = 'gzip'
+        response.vary.add('Accept-Encoding')
+        response.cache_control.public = True
+        return response
+
+    def feed(self):
+        return self.serve('feed.xml', ATOM_TYPE)
+
+    def sitemap(self):
+        return self.serve('sitemap.xml', SITEMAP_TYPE)
+
+    def sitemap_shard(self, number):
+        return self.serve(f'sitemap-{number}.xml', SITEMAP_TYPE)
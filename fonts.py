@@ -0,0 +1,219 @@
+"""
+Self-hosted, subsetted web fonts
+
+``build-assets`` replaces the Font Awesome stylesheet from cdnjs and Inter
+from Google Fonts with files served from ``/assets/``:
+
+* Font Awesome comes from the ``fontawesomefree`` package. Its CSS is
+  pruned to the ``fa-*`` classes that templates and scripts use, and each
+  webfont is cut down to the glyphs of the icons used in that style
+  (``fas``, ``far``, ``fab``).
+* Inter is read from ``static/fonts`` (the ``InterVariable`` or
+  ``Inter-<Weight>`` files of an Inter release). It is subset to Latin and
+  to the weights the stylesheets ask for.
+
+The generated ``@font-face`` and icon rules are prepended to
+``style.css``, so the page's critical CSS carries them too. Without
+fontTools, or without the font sources, a family is left out and
+``base.html`` keeps loading it from its CDN.
+"""
+
+import io
+import os
+import re
+
+import minify
+
+try:
+    from fontTools import subset
+    from fontTools.ttLib import TTFont
+    from fontTools.varLib import instancer
+except ImportError:  # Optional; the CDN stylesheets are used without it
+    subset = None
+
+try:
+    import fontawesomefree
+except ImportError:
+    fontawesomefree = None
+
+FONT_DIR = 'fonts'
+FONT_AWESOME = 'Font Awesome'
+INTER = 'Inter'
+# Loaded by the layout on every page, so fetched before the CSS asks for them
+PRELOAD = ['fonts/inter.woff2', 'fonts/inter-400.woff2', 'fonts/fa-solid-900.woff2']
+
+ICON_FONTS = {'solid': 'fa-solid-900', 'regular': 'fa-regular-400', 'brands': 'fa-brands-400'}
+ICON_STYLES = {'fab': 'brands', 'fa-brands': 'brands', 'far': 'regular', 'fa-regular': 'regular'}
+ICON_FAMILIES = ("'Font Awesome 6 Free'", "'Font Awesome 6 Brands'")
+
+# Google Fonts' "latin" range
+LATIN_RANGE = ('U+0000-00FF,U+0131,U+0152-0153,U+02BB-02BC,U+02C6,U+02DA,U+02DC,U+0304,'
+               'U+0308,U+0329,U+2000-206F,U+2074,U+20AC,U+2122,U+2191,U+2193,U+2212,'
+               'U+2215,U+FEFF,U+FFFD')
+WEIGHT_NAMES = {100: 'Thin', 200: 'ExtraLight', 300: 'Light', 400: 'Regular', 500: 'Medium',
+                600: 'SemiBold', 700: 'Bold', 800: 'ExtraBold', 900: 'Black'}
+# Browser defaults for headings, <strong> and <b>, plus body text
+DEFAULT_WEIGHTS = {400, 700}
+
+
+def _unicodes(unicode_range):
+    codepoints = set()
+    for part in unicode_range.split(','):
+        start, _, end = part[2:].partition('-')
+        codepoints.update(range(int(start, 16), int(end or start, 16) + 1))
+    return codepoints
+
+
+def subset_font(data, unicodes, axis_limits=None):
+    """WOFF2 of ``data`` with only ``unicodes``; ``axis_limits`` narrows a variable font"""
+    font = TTFont(io.BytesIO(data))
+    if axis_limits is not None and 'fvar' in font:
+        limits = {axis.axisTag: None for axis in font['fvar'].axes}
+        limits.update(axis_limits)
+        font = instancer.instantiateVariableFont(font, limits)
+    options = subset.Options()
+    options.flavor = 'woff2'
+    subsetter = subset.Subsetter(options)
+    subsetter.populate(unicodes=unicodes)
+    subsetter.subset(font)
+    output = io.BytesIO()
+    subset.save_font(font, output, options)
+    return output.getvalue()
+
+
+# Font Awesome
+
+def icons_used(text):
+    """``{style: {class names}}`` for every ``fa-*`` class list in ``text``"""
+    used = {}
+    for classes in re.findall(r'class=["\']([^"\']*)["\']', text):
+        names = classes.split()
+        if not any(name in ('fa', 'fas', 'far', 'fab') or name.startswith('fa-') for name in names):
+            continue
+        style = next((ICON_STYLES[name] for name in names if name in ICON_STYLES), 'solid')
+        used.setdefault(style, set()).update(names)
+    return used
+
+
+def _font_awesome_css():
+    root = os.path.join(os.path.dirname(fontawesomefree.__file__), 'static', 'fontawesomefree')
+    with open(os.path.join(root, 'css', 'all.css'), encoding='utf-8') as f:
+        return root, f.read()
+
+
+def _codepoints(nodes):
+    """Icon class name -> codepoint, from ``.fa-name::before { content: "\\f0c2" }``"""
+    codepoints = {}
+    for kind, prelude, body in nodes:
+        content = kind == 'rule' and re.search(r'content:\s*"\\([0-9a-fA-F]+)"', body)
+        if not content:
+            continue
+        for name in re.findall(r'\.(fa-[\w-]+)::?before', prelude):
+            codepoints[name] = int(content.group(1), 16)
+    return codepoints
+
+
+def build_font_awesome(text, emit):
+    """Pruned Font Awesome CSS with subset webfonts; ``emit(name, data)`` returns a URL"""
+    root, css = _font_awesome_css()
+    used = icons_used(text)
+    words = set().union(*used.values()) if used else set()
+    nodes = minify.prune_css(minify.parse_css(css), words, set())
+    codepoints = _codepoints(nodes)
+
+    urls = {}
+    for style, names in sorted(used.items()):
+        font = ICON_FONTS[style]
+        unicodes = {codepoints[name] for name in names if name in codepoints}
+        with open(os.path.join(root, 'webfonts', f'{font}.woff2'), 'rb') as f:
+            data = subset_font(f.read(), unicodes)
+        urls[font] = emit(f'{FONT_DIR}/{font}.woff2', data)
+        print(f"🔤 {font}: {len(unicodes)} icons, {len(data)} bytes")
+
+    kept = []
+    for kind, prelude, body in nodes:
+        if kind == 'at' and prelude == '@font-face':
+            # Only the v6 faces of the styles in use; the v4/v5 shims are not needed
+            font = re.search(r'webfonts/([\w-]+)\.woff2', body).group(1)
+            family = re.search(r'font-family:\s*([^;]+);', body).group(1).strip()
+            if font not in urls or family not in ICON_FAMILIES:
+                continue
+            body = re.sub(r'src:[^;}]+', f'src: url("{urls[font]}") format("woff2")', body)
+        kept.append((kind, prelude, body))
+    return minify.serialize_css(kept)
+
+
+# Inter
+
+def weights_used(css):
+    """Every font-weight the stylesheets use, plus the browser defaults"""
+    weights = set(DEFAULT_WEIGHTS)
+    for value in re.findall(r'font-weight:\s*(\w+)', css):
+        if value.isdigit():
+            weights.add(int(value))
+        elif value in ('bold', 'bolder'):
+            weights.add(700)
+    return weights
+
+
+def _inter_sources(font_folder):
+    """``(variable font path, {weight: static font path})`` found in ``font_folder``"""
+    try:
+        files = sorted(os.listdir(font_folder))
+    except OSError:
+        return None, {}
+    # Prefer WOFF2 over TTF/OTF; the subset is re-encoded either way
+    files.sort(key=lambda name: not name.endswith('.woff2'))
+    variable = next((name for name in files if re.match(r'Inter-?Variable\.(woff2|ttf)$', name)), None)
+    static = {}
+    for weight, name in WEIGHT_NAMES.items():
+        match = next((f for f in files if re.match(rf'Inter-{name}\.(woff2|ttf|otf)$', f)), None)
+        if match:
+            static[weight] = os.path.join(font_folder, match)
+    return variable and os.path.join(font_folder, variable), static
+
+
+def _face(url, weight):
+    return (f"@font-face{{font-family:'{INTER}';font-style:normal;font-weight:{weight};"
+            f"font-display:swap;src:url(\"{url}\") format(\"woff2\");unicode-range:{LATIN_RANGE}}}")
+
+
+def build_inter(font_folder, css, emit):
+    """``@font-face`` rules for the Inter weights in use, or '' without sources"""
+    variable, static = _inter_sources(font_folder)
+    weights = sorted(weights_used(css))
+    unicodes = _unicodes(LATIN_RANGE)
+    if variable:
+        with open(variable, 'rb') as f:
+            data = subset_font(f.read(), unicodes, {'wght': (weights[0], weights[-1])})
+        print(f"🔤 Inter {weights[0]}-{weights[-1]} (variable): {len(data)} bytes")
+        return _face(emit(f'{FONT_DIR}/inter.woff2', data), f'{weights[0]} {weights[-1]}')
+    faces = []
+    for weight in weights:
+        if weight not in static:
+            continue
+        with open(static[weight], 'rb') as f:
+            data = subset_font(f.read(), unicodes)
+        print(f"🔤 Inter {weight}: {len(data)} bytes")
+        faces.append(_face(emit(f'{FONT_DIR}/inter-{weight}.woff2', data), weight))
+    return ''.join(faces)
+
+
+def build_fonts(static_folder, markup, css, emit):
+    """Return ``(css, families)`` for the self-hosted fonts that could be built"""
+    if subset is None:
+        print("⚠️  fonttools is not installed; fonts stay on their CDNs")
+        return '', []
+    rules, families = [], []
+    if fontawesomefree is None:
+        print("⚠️  fontawesomefree is not installed; Font Awesome stays on cdnjs")
+    else:
+        rules.append(build_font_awesome(markup, emit))
+        families.append(FONT_AWESOME)
+    inter = build_inter(os.path.join(static_folder, FONT_DIR), css, emit)
+    if inter:
+        rules.append(inter)
+        families.append(INTER)
+    else:
+        print(f"⚠️  No Inter fonts in static/{FONT_DIR}; Inter stays on Google Fonts")
+    return ''.join(rules), families
@@ -0,0 +1,135 @@
+"""
+Template fragment cache for the Portfolio Website
+
+Pages that cannot be cached whole (flash messages, per-request state)
+still share most of their markup. ``{% cache %}`` keeps the rendered
+output of a block, keyed by a name plus any dependencies:
+
+    {% cache 'footer' %}...{% endcache %}
+    {% cache 'post-card', post.id, post.date_updated %}...{% endcache %}
+
+Dependencies that change with the data (an id plus its modification
+time) make stale entries unreachable. ``FragmentCache.invalidate()`` drops
+fragments by name for data that has no such timestamp. Like the page
+cache, it bumps a stamp file that the other workers check once per
+request. Entries live in a per-process LRU bounded by
+``FRAGMENT_CACHE_BYTES``, and hits and misses are counted per fragment.
+"""
+
+import os
+import threading
+from collections import OrderedDict
+
+from jinja2 import nodes
+from jinja2.ext import Extension
+
+from stamps import Stamp
+
+
+class FragmentCacheExtension(Extension):
+    """The ``{% cache name, dependency... %}...{% endcache %}`` tag"""
+
+    tags = {'cache'}
+
+    def __init__(self, environment):
+        super().__init__(environment)
+        environment.extend(fragment_cache=None)
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        parts = [parser.parse_expression()]
+        while parser.stream.skip_if('comma'):
+            parts.append(parser.parse_expression())
+        body = parser.parse_statements(('name:endcache',), drop_needle=True)
+        call = self.call_method('_render', [nodes.List(parts)])
+        return nodes.CallBlock(call, [], [], body).set_lineno(lineno)
+
+    def _render(self, parts, caller):
+        cache = self.environment.fragment_cache
+        if cache is None:
+            return caller()
+        return cache.get_or_render(parts[0], parts[1:], caller)
+
+
+class FragmentCache:
+    """Per-process LRU of rendered template fragments with per-name statistics"""
+
+    def __init__(self, app=None):
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self._stats = {}
+        self.max_bytes = 8 * 1024 * 1024
+        self.stamp = Stamp()
+        self.evictions = 0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('FRAGMENT_CACHE_BYTES', 8 * 1024 * 1024)
+        self.max_bytes = app.config['FRAGMENT_CACHE_BYTES']
+        os.makedirs(app.instance_path, exist_ok=True)
+        self.stamp = Stamp(os.path.join(app.instance_path, 'fragment-cache.stamp'))
+        app.jinja_env.add_extension(FragmentCacheExtension)
+        app.jinja_env.fragment_cache = self if self.max_bytes > 0 else None
+        app.before_request(self._check_stamp)
+        app.extensions['fragment_cache'] = self
+
+    def get_or_render(self, name, dependencies, render):
+        key = (name,) + tuple(str(dependency) for dependency in dependencies)
+        with self._lock:
+            stats = self._stats.setdefault(name, {'hits': 0, 'misses': 0})
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+                stats['hits'] += 1
+                return value
+            stats['misses'] += 1
+        value = render()
+        self._store(key, value)
+        return value
+
+    def _store(self, key, value):
+        size = len(value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= len(previous)
+            self._entries[key] = value
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+                self.evictions += 1
+
+    def invalidate(self, *names):
+        """Drop the fragments called ``names`` (all fragments if none given)"""
+        self._drop(names)
+        self.stamp.bump()
+
+    def _drop(self, names=()):
+        with self._lock:
+            for key in [key for key in self._entries if not names or key[0] in names]:
+                self._bytes -= len(self._entries.pop(key))
+
+    def stats(self):
+        with self._lock:
+            fragments = {}
+            for name, counts in sorted(self._stats.items()):
+                lookups = counts['hits'] + counts['misses']
+                fragments[name] = dict(counts, hit_rate=round(counts['hits'] / lookups, 4)
+                                       if lookups else 0.0)
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'evictions': self.evictions,
+                'fragments': fragments,
+            }
+
+    def _check_stamp(self):
+        """Clear everything if another worker invalidated since our last look"""
+        if self.stamp.changed():
+            self._drop()
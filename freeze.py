@@ -0,0 +1,222 @@
+"""
+Static export ("freeze") for the Portfolio Website
+
+``python setup.py freeze`` renders every read-only page through the app's
+test client and writes it to a directory, with the static files and
+fingerprinted assets next to it, so nginx or a CDN can serve the whole
+site without Python:
+
+    /                    -> index.html
+    /about               -> about/index.html
+    /blog/<id>           -> blog/<id>/index.html
+    /blog, /api/posts    -> blog/index.html, api/posts/index.json
+    later listing pages  -> blog/page/<n>/index.html, api/posts/page/<n>/index.json
+    /feed.xml, /sitemap*.xml -> the same names
+
+Keyset cursors live in the query string, which static hosting cannot
+route on, so listing pages are written under numbered paths and their
+older/newer links are rewritten to match. Forms and search still need
+the app (proxy ``/blog/new`` and ``/blog/search`` to it).
+
+With ``FREEZE_DIR`` set, publishing a post rebuilds just the pages it
+affects in the background: the post itself, ``/``, the archive and the
+listing pages. Listings are newest-first, so every listing page shifts by
+one post; the feed and sitemap are copied again too.
+"""
+
+import gzip
+import os
+import shutil
+import threading
+import time
+from urllib.parse import urlsplit
+
+try:
+    import brotli
+except ImportError:  # Brotli is optional; gzip variants are always written
+    brotli = None
+
+# Endpoints that need the app (forms, search, monitoring) or that freeze()
+# renders itself (listings, posts and assets)
+SKIPPED_ENDPOINTS = {
+    'static', 'assets', 'new_blog_post', 'blog_search', 'blog', 'blog_json',
+    'blog_post', 'health_check', 'cache_stats', 'metrics', 'livez', 'readyz',
+    'feed', 'sitemap', 'sitemap_shard', 'jobs_status', 'replica_status',
+}
+
+# Marks test-client requests made by the freezer, e.g. so metrics skip them
+INTERNAL_ENVIRON = {'portfolio.internal': True}
+
+
+def output_path(url_path, mimetype='text/html'):
+    """Relative file that serves ``url_path`` from a static web server"""
+    path = url_path.strip('/')
+    if path and '.' in path.rsplit('/', 1)[-1]:
+        return path
+    index = 'index.json' if mimetype == 'application/json' else 'index.html'
+    return f'{path}/{index}' if path else index
+
+
+class Freezer:
+    """Writes the site as static files and keeps them current after publishing"""
+
+    def __init__(self, app=None):
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('FREEZE_DIR', None)
+        app.config.setdefault('FREEZE_PRECOMPRESS', False)
+        app.extensions['freezer'] = self
+
+    def _write(self, app, output, relative, data):
+        path = os.path.join(output, relative)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        variants = [('', data)]
+        if app.config['FREEZE_PRECOMPRESS']:
+            # For nginx gzip_static / brotli_static
+            variants.append(('.gz', gzip.compress(data, compresslevel=9, mtime=0)))
+            if brotli is not None:
+                variants.append(('.br', brotli.compress(data, quality=11)))
+        for suffix, body in variants:
+            tmp = f'{path}{suffix}.tmp'
+            with open(tmp, 'wb') as f:
+                f.write(body)
+            os.replace(tmp, path + suffix)
+        # A stale .gz/.br from an earlier precompressed build would shadow the page
+        written = {suffix for suffix, body in variants}
+        for suffix in ('.gz', '.br'):
+            if suffix not in written and os.path.exists(path + suffix):
+                os.remove(path + suffix)
+
+    def _request(self, app, client, url):
+        # A fresh app context per page, so each gets its own database session
+        # even when the freezer runs inside a job's context
+        with app.app_context():
+            return client.get(url, environ_base=INTERNAL_ENVIRON)
+
+    def _get(self, app, client, url):
+        response = self._request(app, client, url)
+        if response.status_code != 200:
+            raise RuntimeError(f"GET {url} returned {response.status_code}")
+        return response
+
+    def freeze_pages(self, app, client, output):
+        """Pages without URL arguments, plus the 404 page; return the count"""
+        written = 0
+        for rule in app.url_map.iter_rules():
+            if rule.arguments or 'GET' not in rule.methods or rule.endpoint in SKIPPED_ENDPOINTS:
+                continue
+            response = self._get(app, client, rule.rule)
+            self._write(app, output, output_path(rule.rule, response.mimetype), response.data)
+            written += 1
+        response = self._request(app, client, '/__freeze_missing__')
+        self._write(app, output, '404.html', response.data)
+        return written + 1
+
+    def freeze_listings(self, app, client, output):
+        """Every /blog and /api/posts page; return the post ids listed and the page count"""
+        post_ids = []
+        query = ''
+        number = 1
+        while True:
+            suffix = f'?{query}' if query else ''
+            data = self._get(app, client, '/api/posts' + suffix).get_json()
+            html = self._get(app, client, '/blog' + suffix).get_data(as_text=True)
+            post_ids.extend(post['id'] for post in data['posts'])
+
+            # The same cursors drive both representations of the page
+            links = {}
+            if data['next']:
+                links['next'] = (urlsplit(data['next']).query, number + 1)
+            if data['prev']:
+                links['prev'] = (urlsplit(data['prev']).query, number - 1)
+            for name, (link_query, target) in links.items():
+                blog_url = '/blog/' if target == 1 else f'/blog/page/{target}/'
+                api_url = '/api/posts/' if target == 1 else f'/api/posts/page/{target}/'
+                html = html.replace(f'/blog?{link_query}"', f'{blog_url}"')
+                data[name] = api_url
+
+            base = '' if number == 1 else f'page/{number}/'
+            self._write(app, output, f'blog/{base}index.html', html.encode())
+            self._write(app, output, f'api/posts/{base}index.json',
+                        app.json.dumps(data).encode())
+            if not data['next']:
+                break
+            query = links['next'][0]
+            number += 1
+
+        # Fewer posts than last time: drop pages past the new end
+        for section in ('blog', 'api/posts'):
+            folder = os.path.join(output, section, 'page')
+            if os.path.isdir(folder):
+                for name in os.listdir(folder):
+                    if name.isdigit() and int(name) > number:
+                        shutil.rmtree(os.path.join(folder, name), ignore_errors=True)
+        return post_ids, number
+
+    def freeze_feeds(self, app, client, output):
+        """The Atom feed, the sitemap and any sitemap shards"""
+        feeds = app.extensions.get('feeds')
+        if feeds is None:
+            return 0
+        # Bring the stored state up to date first, so the shard list matches the index
+        with app.app_context():
+            feeds.refresh(app)
+        urls = ['/feed.xml', '/sitemap.xml'] + feeds.shard_urls()
+        for url in urls:
+            self._write(app, output, output_path(url), self._get(app, client, url).data)
+        return len(urls)
+
+    def freeze_post(self, app, client, output, post_id):
+        url = f'/blog/{post_id}'
+        self._write(app, output, output_path(url), self._get(app, client, url).data)
+
+    def copy_static(self, app, output):
+        """Copy /static and the fingerprinted /assets"""
+        shutil.copytree(app.static_folder, os.path.join(output, 'static'), dirs_exist_ok=True,
+                        ignore=shutil.ignore_patterns('dist'))
+        dist = os.path.join(app.static_folder, 'dist')
+        if os.path.isdir(dist):
+            shutil.copytree(dist, os.path.join(output, 'assets'), dirs_exist_ok=True)
+
+    def freeze(self, app, output=None, progress=print):
+        """Write the whole site to ``output``; return counts and timings"""
+        output = output or app.config['FREEZE_DIR']
+        started = time.monotonic()
+        client = app.test_client()
+        stats = {'pages': self.freeze_pages(app, client, output)
+                 + self.freeze_feeds(app, client, output)}
+        post_ids, stats['listing_pages'] = self.freeze_listings(app, client, output)
+        listed = time.monotonic()
+        for count, post_id in enumerate(post_ids, 1):
+            self.freeze_post(app, client, output, post_id)
+            if progress and count % 1000 == 0:
+                progress(f"🧊 {count}/{len(post_ids)} posts")
+        stats['posts'] = len(post_ids)
+        self.copy_static(app, output)
+        stats['listing_seconds'] = round(listed - started, 2)
+        stats['seconds'] = round(time.monotonic() - started, 2)
+        return stats
+
+    def rebuild_published(self, app, post_ids, output=None):
+        """Re-render the pages that publishing ``post_ids`` changed"""
+        output = output or app.config['FREEZE_DIR']
+        client = app.test_client()
+        for post_id in post_ids:
+            self.freeze_post(app, client, output, post_id)
+        self._write(app, output, 'index.html', self._get(app, client, '/').data)
+        if 'blog_archive' in app.view_functions:
+            self._write(app, output, output_path('/blog/archive'),
+                        self._get(app, client, '/blog/archive').data)
+        self.freeze_listings(app, client, output)
+        self.freeze_feeds(app, client, output)
+
+    def rebuild(self, app, post_id):
+        """Rebuild after publishing ``post_id``; errors propagate so the job is retried"""
+        if not app.config['FREEZE_DIR']:
+            return
+        # One rebuild at a time: each rewrites the same listing pages and feeds
+        with self._lock:
+            self.rebuild_published(app, [post_id])
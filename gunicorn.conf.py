@@ -1,16 +1,89 @@
+import importlib.util
+import multiprocessing
 import os
 
+# Concurrency profile: "sync", "gthread" (default) or "async".
+# Worker and thread counts are derived from the CPU count and the memory
+# available to the container. WEB_CONCURRENCY overrides the worker count and
+# GUNICORN_THREADS the gthread pool size.
+PROFILE = os.environ.get('GUNICORN_PROFILE', 'gthread').lower()
+
+# The async profile needs gevent (pip install gevent); without it fall back to gthread
+if PROFILE == 'async' and importlib.util.find_spec('gevent') is None:
+    print("⚠️  GUNICORN_PROFILE=async requires gevent; using gthread")
+    PROFILE = 'gthread'
+
+# Resident memory budgeted per worker process, in MB
+WORKER_MEMORY_MB = int(os.environ.get('GUNICORN_WORKER_MEMORY_MB', 120))
+
+
+def _cpu_count():
+    """CPUs this process may actually run on (affinity / container aware)"""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return multiprocessing.cpu_count()
+
+
+def _memory_mb():
+    """Memory available to the container in MB, or None if unknown"""
+    try:
+        with open('/sys/fs/cgroup/memory.max') as f:
+            limit = f.read().strip()
+        if limit != 'max':
+            return int(limit) // (1024 * 1024)
+    except (OSError, ValueError):
+        pass
+    try:
+        with open('/proc/meminfo') as f:
+            for line in f:
+                if line.startswith('MemAvailable:'):
+                    return int(line.split()[1]) // 1024
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+def _worker_count(per_cpu, extra=0):
+    count = _cpu_count() * per_cpu + extra
+    memory = _memory_mb()
+    if memory:
+        # Leave a quarter of the memory for the master and page cache
+        count = min(count, max(1, int(memory * 0.75) // WORKER_MEMORY_MB))
+    return max(1, count)
+
+
+if PROFILE == 'sync':
+    # One request per process; classic (2 x cores) + 1 sizing
+    worker_class = "sync"
+    workers = _worker_count(2, extra=1)
+    threads = 1
+elif PROFILE == 'async':
+    # Cooperative greenlets; a few processes each holding many connections
+    worker_class = "gevent"
+    workers = _worker_count(1)
+    threads = 1
+else:
+    PROFILE = 'gthread'
+    # A process per core, each with a small thread pool for I/O waits
+    worker_class = "gthread"
+    workers = _worker_count(1, extra=1)
+    threads = int(os.environ.get('GUNICORN_THREADS', 4))
+
+workers = int(os.environ.get('WEB_CONCURRENCY', workers))
+
 # Server socket
 bind = f"0.0.0.0:{os.environ.get('PORT', 8000)}"
 backlog = 2048
 
 # Worker processes
-workers = 1
-worker_class = "sync"
 worker_connections = 1000
 timeout = 120
 keepalive = 2
 
+# Import the app once in the master; workers share it copy-on-write
+preload_app = True
+
 # Restart workers after this many requests, to help prevent memory leaks
 max_requests = 1000
 max_requests_jitter = 50
@@ -28,4 +101,32 @@ daemon = False
 pidfile = None
 user = None
 group = None
-tmp_upload_dir = None
\ No newline at end of file
+tmp_upload_dir = None
+
+
+def on_starting(server):
+    server.log.info("Concurrency profile %s: %s workers x %s threads (%s)",
+                    PROFILE, workers, threads, worker_class)
+
+
+def post_fork(server, worker):
+    # Database connections opened in the master during preload must not be
+    # shared between processes; drop them without closing the parent's sockets.
+    # db.engines holds the primary and every read replica (see replicas.py).
+    from app import app, db
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=False)
+
+
+def worker_exit(server, worker):
+    # Write out the request metrics gathered since the last periodic flush
+    from app import metrics
+    metrics.flush()
+
+
+def child_exit(server, worker):
+    # Keep an exited worker's counters so /metrics stays monotonic
+    from app import metrics
+    from metrics import archive_worker
+    archive_worker(metrics.directory, worker.pid)
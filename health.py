@@ -0,0 +1,80 @@
+"""
+Liveness and readiness probes for the Portfolio Website
+
+``/livez`` answers as long as the worker can serve a request and touches
+nothing else. ``/readyz`` runs the registered dependency checks (database,
+templates) and reports each one's latency. The result is cached per
+worker for ``READINESS_CACHE_SECONDS``, so however often the platform
+probes, each worker checks its dependencies at most once per interval.
+"""
+
+import threading
+import time
+
+from flask import jsonify
+
+
+class Health:
+    """Registers /livez and /readyz and caches readiness results"""
+
+    def __init__(self, app=None):
+        self.checks = {}
+        self.ttl = 5
+        self._lock = threading.Lock()
+        self._result = None
+        self._checked_at = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('READINESS_CACHE_SECONDS', 5)
+        self.ttl = app.config['READINESS_CACHE_SECONDS']
+        app.add_url_rule('/livez', 'livez', self.livez)
+        app.add_url_rule('/readyz', 'readyz', self.readyz)
+
+    def check(self, name):
+        """Decorator registering a readiness check; it fails by raising"""
+        def decorator(fn):
+            self.checks[name] = fn
+            return fn
+        return decorator
+
+    def run_checks(self):
+        results = {}
+        for name, fn in self.checks.items():
+            started = time.perf_counter()
+            try:
+                fn()
+                result = {'ok': True}
+            except Exception as e:
+                # Probes are public: report the kind of failure, not its details
+                result = {'ok': False, 'error': type(e).__name__}
+            result['latency_ms'] = round((time.perf_counter() - started) * 1000, 2)
+            results[name] = result
+        return results
+
+    def readiness(self):
+        """Cached check results plus their age in seconds"""
+        now = time.monotonic()
+        if self._result is None or now - self._checked_at >= self.ttl:
+            # One probe refreshes; concurrent probes reuse what it finds
+            with self._lock:
+                if self._result is None or time.monotonic() - self._checked_at >= self.ttl:
+                    self._result = self.run_checks()
+                    self._checked_at = time.monotonic()
+        return self._result, time.monotonic() - self._checked_at
+
+    def livez(self):
+        return {'status': 'alive'}, 200
+
+    def readyz(self):
+        checks, age = self.readiness()
+        ready = all(result['ok'] for result in checks.values())
+        response = jsonify({
+            'status': 'ready' if ready else 'unavailable',
+            'checks': checks,
+            'age_s': round(age, 2),
+        })
+        response.status_code = 200 if ready else 503
+        response.cache_control.no_store = True
+        return response
@@ -0,0 +1,183 @@
+"""
+Bulk post importer for the Portfolio Website
+
+Streams posts from a JSONL file or a directory of Markdown files with
+front-matter and inserts them in batched transactions. Memory use is
+bounded by the batch size whatever the input size: each batch is
+deduplicated against existing titles with one ``IN`` query and written
+with a single executemany (or COPY on PostgreSQL with psycopg2).
+"""
+
+import csv
+import io
+import json
+import os
+import time
+from datetime import datetime, timezone
+
+from sqlalchemy import insert, select
+
+from app import db, BlogPost, fragment_cache, object_cache, page_cache, summarize_content
+from search import index_rows
+from rendering import render_fields
+
+DEFAULT_BATCH_SIZE = 1000
+
+
+def parse_date(value):
+    """Parse an ISO date/datetime into a naive UTC datetime"""
+    if isinstance(value, datetime):
+        parsed = value
+    else:
+        parsed = datetime.fromisoformat(str(value).strip().replace('Z', '+00:00'))
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+def read_jsonl(path):
+    """Yield post dicts from a file with one JSON object per line"""
+    with open(path, encoding='utf-8') as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError as e:
+                raise ValueError(f"{path}:{line_number}: invalid JSON ({e})") from e
+
+
+def parse_front_matter(text):
+    """Split ``---`` delimited ``key: value`` front-matter from a Markdown body"""
+    meta = {}
+    if text.startswith('---'):
+        header, sep, body = text[3:].partition('\n---')
+        if sep:
+            for line in header.splitlines():
+                key, colon, value = line.partition(':')
+                if colon and key.strip():
+                    meta[key.strip().lower()] = value.strip().strip('"\'')
+            text = body.split('\n', 1)[1] if '\n' in body else ''
+    return meta, text.strip()
+
+
+def read_markdown_dir(path):
+    """Yield post dicts from ``*.md`` files in ``path`` (title defaults to the file name)"""
+    with os.scandir(path) as entries:
+        for entry in entries:
+            if not entry.is_file() or not entry.name.endswith('.md'):
+                continue
+            with open(entry.path, encoding='utf-8') as f:
+                meta, body = parse_front_matter(f.read())
+            meta.setdefault('title', os.path.splitext(entry.name)[0].replace('-', ' ').title())
+            meta['content'] = body
+            yield meta
+
+
+def read_posts(path):
+    """Pick the reader for ``path``"""
+    if os.path.isdir(path):
+        return read_markdown_dir(path)
+    return read_jsonl(path)
+
+
+def _row(record, now):
+    title = (record.get('title') or '').strip()
+    content = (record.get('content') or '').strip()
+    if not title or not content:
+        return None
+    posted = record.get('date_posted') or record.get('date')
+    posted = parse_date(posted) if posted else now
+    row = {
+        'title': title[:200],
+        'content': content,
+        'date_posted': posted,
+        'date_updated': posted,
+    }
+    row.update(summarize_content(content))
+    row.update(render_fields(content))
+    return row
+
+
+def _existing_titles(table, titles):
+    return set(db.session.execute(
+        select(table.c.title).where(table.c.title.in_(titles))
+    ).scalars())
+
+
+def _copy_rows(table, rows):
+    """Load ``rows`` with PostgreSQL COPY through the raw psycopg2 cursor"""
+    columns = list(rows[0])
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow([row[c] for c in columns])
+    buffer.seek(0)
+    cursor = db.session.connection().connection.cursor()
+    cursor.copy_expert(
+        f"COPY {table.name} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", buffer)
+
+
+def _insert_batch(table, rows):
+    dialect = db.engine.dialect
+    if dialect.name == 'postgresql' and dialect.driver == 'psycopg2':
+        _copy_rows(table, rows)
+        return
+    if dialect.name == 'sqlite':
+        # The FTS5 index needs the new ids; RETURNING with executemany
+        # still sends one batched statement.
+        inserted = db.session.execute(
+            insert(table).returning(table.c.id, table.c.title, table.c.content), rows)
+        index_rows(db, inserted.all())
+        return
+    db.session.execute(insert(table), rows)
+
+
+def import_posts(records, batch_size=DEFAULT_BATCH_SIZE, progress=print):
+    """Insert ``records`` (an iterable of dicts) as BlogPosts; return counts.
+
+    Must run inside an application context.
+    """
+    table = BlogPost.__table__
+    stats = {'read': 0, 'inserted': 0, 'skipped': 0, 'invalid': 0}
+    started = time.monotonic()
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    batch = {}
+
+    def flush():
+        if not batch:
+            return
+        existing = _existing_titles(table, list(batch))
+        rows = [row for title, row in batch.items() if title not in existing]
+        stats['skipped'] += len(batch) - len(rows)
+        if rows:
+            _insert_batch(table, rows)
+        db.session.commit()
+        stats['inserted'] += len(rows)
+        batch.clear()
+        if progress:
+            rate = stats['read'] / max(time.monotonic() - started, 1e-9)
+            progress(f"📥 {stats['read']} read, {stats['inserted']} inserted, "
+                     f"{stats['skipped']} skipped, {stats['invalid']} invalid ({rate:.0f} posts/s)")
+
+    for record in records:
+        stats['read'] += 1
+        row = _row(record, now)
+        if row is None:
+            stats['invalid'] += 1
+            continue
+        if row['title'] in batch:
+            stats['skipped'] += 1
+            continue
+        batch[row['title']] = row
+        if len(batch) >= batch_size:
+            flush()
+    flush()
+    if stats['inserted']:
+        # Core inserts skip the session events that keep the caches current:
+        # drop negative entries for the new ids and every rendered listing
+        object_cache.clear()
+        fragment_cache.invalidate()
+        page_cache.invalidate()
+    return stats
@@ -0,0 +1,324 @@
+"""
+Background jobs for the Portfolio Website
+
+Work that does not have to finish before a response (rendering, search
+indexing, feed updates, cache invalidation, static rebuilds) is queued
+as a row in the ``job`` table, inside the same transaction as the change
+that caused it. A job is therefore queued if and only if that change is
+committed. After the commit, a small thread pool in the worker runs it.
+
+Jobs survive worker recycling and crashes. Every worker polls the table
+for due jobs, and a job whose worker died is picked up again when its
+lease (``JOBS_LEASE_SECONDS``) expires. A job's own database writes are
+committed together with its "done" status, so they happen exactly once.
+Failures are retried with exponential backoff, up to
+``JOBS_MAX_ATTEMPTS`` times, and then the job is marked failed.
+
+Each job has an idempotency key (by default ``kind:payload``). Enqueueing
+a job whose key is already in the table does nothing.
+"""
+
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+from flask import jsonify
+from sqlalchemy import (Column, DateTime, Index, Integer, MetaData, String, Table, Text,
+                        and_, delete, event, func, insert, or_, select, update)
+from sqlalchemy.dialects import postgresql, sqlite
+
+job_table = Table(
+    'job', MetaData(),
+    Column('id', Integer, primary_key=True),
+    Column('kind', String(50), nullable=False),
+    Column('key', String(200), nullable=False, unique=True),
+    Column('payload', Text, nullable=False),
+    Column('status', String(10), nullable=False),
+    Column('attempts', Integer, nullable=False, default=0),
+    Column('max_attempts', Integer, nullable=False),
+    Column('run_after', DateTime, nullable=False),
+    Column('locked_until', DateTime),
+    Column('last_error', Text),
+    Column('created_at', DateTime, nullable=False),
+    Column('finished_at', DateTime),
+    # Claiming scans for due jobs by status and time
+    Index('ix_job_status_run_after', 'status', 'run_after'),
+)
+
+QUEUED, RUNNING, DONE, FAILED = 'queued', 'running', 'done', 'failed'
+
+
+def _now():
+    # Naive UTC, like the other timestamps in the database
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def ensure_job_table(engine):
+    job_table.create(bind=engine, checkfirst=True)
+
+
+def _insert_ignoring_duplicates(dialect_name, values):
+    """INSERT that silently skips a row whose idempotency key already exists"""
+    if dialect_name == 'sqlite':
+        return sqlite.insert(job_table).values(values).on_conflict_do_nothing(
+            index_elements=['key'])
+    if dialect_name == 'postgresql':
+        return postgresql.insert(job_table).values(values).on_conflict_do_nothing(
+            index_elements=['key'])
+    return None
+
+
+class Jobs:
+    """Durable job queue in the database, run by a per-worker thread pool"""
+
+    def __init__(self, app=None, db=None):
+        self.db = db
+        self.app = None
+        self.handlers = {}
+        self.workers = 2
+        self._executor = None
+        self._poller = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self._running = 0
+        self._pruned_at = 0
+        self.completed = 0
+        self.retried = 0
+        self.failed = 0
+        if app is not None:
+            self.init_app(app, db)
+
+    def init_app(self, app, db=None):
+        app.config.setdefault('JOBS_WORKERS', 2)
+        app.config.setdefault('JOBS_MAX_ATTEMPTS', 5)
+        app.config.setdefault('JOBS_RETRY_SECONDS', 10)
+        app.config.setdefault('JOBS_LEASE_SECONDS', 300)
+        app.config.setdefault('JOBS_POLL_SECONDS', 5)
+        app.config.setdefault('JOBS_RETENTION_DAYS', 7)
+        self.db = db or self.db
+        if job_table.name not in self.db.metadata.tables:
+            # So db.create_all() creates the table along with the models
+            job_table.to_metadata(self.db.metadata)
+        self.app = app
+        self.workers = app.config['JOBS_WORKERS']
+        app.extensions['jobs'] = self
+        app.add_url_rule('/jobs', 'jobs_status', self.view)
+        app.before_request(self._ensure_started)
+        if not event.contains(self.db.session, 'after_commit', self._after_commit):
+            event.listen(self.db.session, 'after_commit', self._after_commit)
+
+    def task(self, kind, max_attempts=None):
+        """Decorator registering the handler for ``kind``; it receives the payload as keywords"""
+        def decorator(fn):
+            self.handlers[kind] = (fn, max_attempts)
+            return fn
+        return decorator
+
+    # Queueing
+
+    def enqueue(self, kind, key=None, delay=0, **payload):
+        """Queue a job in the current transaction; it runs once that commits"""
+        payload_json = json.dumps(payload, sort_keys=True)
+        now = _now()
+        max_attempts = self.handlers.get(kind, (None, None))[1] \
+            or self.app.config['JOBS_MAX_ATTEMPTS']
+        values = {
+            'kind': kind,
+            'key': (key or f'{kind}:{payload_json}')[:200],
+            'payload': payload_json,
+            'status': QUEUED,
+            'attempts': 0,
+            'max_attempts': max_attempts,
+            'run_after': now + timedelta(seconds=delay),
+            'created_at': now,
+        }
+        session = self.db.session
+        statement = _insert_ignoring_duplicates(self.db.engine.dialect.name, values)
+        if statement is not None:
+            session.execute(statement)
+        elif session.execute(select(job_table.c.id).where(
+                job_table.c.key == values['key'])).first() is None:
+            session.execute(insert(job_table).values(values))
+        session.info['jobs_enqueued'] = True
+
+    def _after_commit(self, session):
+        if session.info.pop('jobs_enqueued', False):
+            self.kick()
+
+    # Running
+
+    def _ensure_started(self):
+        # Threads do not survive a fork, so each worker starts its own
+        if self._pid == os.getpid() or self.workers <= 0:
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._executor = ThreadPoolExecutor(max_workers=self.workers,
+                                                thread_name_prefix='jobs')
+            self._running = 0
+            self._poller = threading.Thread(target=self._poll, name='jobs-poller', daemon=True)
+            self._poller.start()
+            self._pid = os.getpid()
+
+    def kick(self):
+        """Start another runner if the pool has room; it drains every due job"""
+        self._ensure_started()
+        if self._executor is None:
+            return
+        with self._lock:
+            if self._running >= self.workers:
+                return
+            self._running += 1
+        self._executor.submit(self._drain)
+
+    def _drain(self):
+        try:
+            while self.run_once():
+                pass
+        except Exception:
+            self.app.logger.exception('Job runner stopped')
+        finally:
+            with self._lock:
+                self._running -= 1
+
+    def _poll(self):
+        # Picks up retries that came due and jobs left behind by other workers
+        while True:
+            time.sleep(self.app.config['JOBS_POLL_SECONDS'])
+            try:
+                self.kick()
+                if time.monotonic() - self._pruned_at >= 3600:
+                    self._pruned_at = time.monotonic()
+                    with self.app.app_context():
+                        self.prune()
+            except Exception:
+                self.app.logger.exception('Job poller failed')
+
+    def _claim(self):
+        """Mark the next due job running for this worker; return it or None"""
+        db = self.db
+        now = _now()
+        due = or_(
+            and_(job_table.c.status == QUEUED, job_table.c.run_after <= now),
+            # Its worker died mid-job
+            and_(job_table.c.status == RUNNING, job_table.c.locked_until < now),
+        )
+        runnable = and_(due, job_table.c.attempts < job_table.c.max_attempts)
+        for _ in range(5):
+            job = db.session.execute(
+                select(job_table).where(runnable).order_by(job_table.c.id).limit(1)).first()
+            if job is None:
+                db.session.rollback()
+                return None
+            # Optimistic: another worker that claimed it first makes this match nothing
+            claimed = db.session.execute(
+                update(job_table)
+                .where(job_table.c.id == job.id, runnable)
+                .values(status=RUNNING, attempts=job_table.c.attempts + 1,
+                        locked_until=now + timedelta(seconds=self.app.config['JOBS_LEASE_SECONDS'])))
+            db.session.commit()
+            if claimed.rowcount == 1:
+                return SimpleNamespace(**dict(job._mapping, attempts=job.attempts + 1))
+        return None
+
+    def run_once(self):
+        """Claim and run one due job; return False when there was none"""
+        with self.app.app_context():
+            job = self._claim()
+            if job is None:
+                return False
+            self._run(job)
+            return True
+
+    def _run(self, job):
+        db = self.db
+        try:
+            handler = self.handlers.get(job.kind, (None, None))[0]
+            if handler is None:
+                raise LookupError(f'no handler for job kind {job.kind!r}')
+            handler(**json.loads(job.payload))
+            # The handler's own writes commit together with the status
+            db.session.execute(update(job_table).where(job_table.c.id == job.id).values(
+                status=DONE, finished_at=_now(), locked_until=None, last_error=None))
+            db.session.commit()
+            self.completed += 1
+        except Exception as e:
+            db.session.rollback()
+            error = f'{type(e).__name__}: {e}'[:2000]
+            if job.attempts >= job.max_attempts:
+                values = {'status': FAILED, 'finished_at': _now()}
+                self.failed += 1
+                self.app.logger.exception('Job %s (%s) failed for good', job.id, job.key)
+            else:
+                backoff = self.app.config['JOBS_RETRY_SECONDS'] * 2 ** (job.attempts - 1)
+                values = {'status': QUEUED, 'run_after': _now() + timedelta(seconds=backoff)}
+                self.retried += 1
+                self.app.logger.warning('Job %s (%s) failed, retrying in %s s: %s',
+                                        job.id, job.key, backoff, error)
+            db.session.execute(update(job_table).where(job_table.c.id == job.id).values(
+                locked_until=None, last_error=error, **values))
+            db.session.commit()
+
+    def run_pending(self):
+        """Run every due job in this thread (for the CLI); return how many ran"""
+        count = 0
+        while self.run_once():
+            count += 1
+        return count
+
+    def prune(self):
+        """Forget finished jobs past the retention period and give up on stuck ones"""
+        db = self.db
+        now = _now()
+        cutoff = now - timedelta(days=self.app.config['JOBS_RETENTION_DAYS'])
+        db.session.execute(delete(job_table).where(
+            job_table.c.status == DONE, job_table.c.finished_at < cutoff))
+        # Out of attempts and its last worker died: nobody will claim it again
+        db.session.execute(update(job_table).where(
+            job_table.c.status == RUNNING, job_table.c.locked_until < now,
+            job_table.c.attempts >= job_table.c.max_attempts,
+        ).values(status=FAILED, finished_at=now, last_error='lease expired'))
+        db.session.commit()
+
+    # Status
+
+    def status(self, failures=10):
+        """Queue depth and per-kind counts, plus the most recent failures"""
+        db = self.db
+        now = _now()
+        counts = {}
+        for kind, status, count in db.session.execute(
+                select(job_table.c.kind, job_table.c.status, func.count())
+                .group_by(job_table.c.kind, job_table.c.status)):
+            counts.setdefault(kind, {})[status] = count
+        due, oldest = db.session.execute(
+            select(func.count(), func.min(job_table.c.run_after))
+            .where(job_table.c.status == QUEUED, job_table.c.run_after <= now)).one()
+        recent = db.session.execute(
+            select(job_table.c.id, job_table.c.kind, job_table.c.key, job_table.c.attempts,
+                   job_table.c.last_error, job_table.c.finished_at)
+            .where(job_table.c.status == FAILED)
+            .order_by(job_table.c.finished_at.desc()).limit(failures)).mappings()
+        return {
+            'queue_depth': due,
+            'oldest_due_seconds': round((now - oldest).total_seconds(), 1) if oldest else 0,
+            'counts': counts,
+            'failed': [dict(row) for row in recent],
+            'worker': {'pid': os.getpid(), 'running': self._running, 'threads': self.workers,
+                       'completed': self.completed, 'retried': self.retried,
+                       'failed': self.failed},
+        }
+
+    def view(self):
+        status = self.status()
+        # Public endpoint: error messages stay in the log and `setup.py jobs`
+        for job in status['failed']:
+            job['last_error'] = (job['last_error'] or '').split(':', 1)[0]
+        response = jsonify(status)
+        response.cache_control.no_store = True
+        return response
@@ -0,0 +1,280 @@
+"""
+Request metrics for the Portfolio Website
+
+Every request records its total time, the number and duration of the SQL
+statements it ran (SQLAlchemy cursor events) and the time spent rendering
+templates (Flask template signals). The breakdown is sent back in a
+``Server-Timing`` header and added to per-route counters and histograms.
+
+Each gunicorn worker periodically writes its totals to its own JSON file
+in the metrics directory; ``/metrics`` merges all of them into the
+Prometheus text format. When a worker exits, the master folds its file
+into ``archive.json`` (see ``child_exit`` in gunicorn.conf.py), so
+counters stay monotonic across worker recycling.
+"""
+
+import json
+import os
+import threading
+import time
+
+from flask import Response, current_app, g, has_app_context, has_request_context, request
+from flask import before_render_template, template_rendered
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+ARCHIVE = 'archive.json'
+
+HELP = {
+    'http_requests_total': ('counter', "Requests by route, method and status"),
+    'http_request_duration_seconds': ('histogram', "Total request time"),
+    'db_query_duration_seconds': ('histogram', "SQL time per request"),
+    'template_render_duration_seconds': ('histogram', "Template rendering time per request"),
+    'db_queries_total': ('counter', "SQL statements executed"),
+    'db_slow_queries_total': ('counter', "SQL statements slower than SLOW_QUERY_MS"),
+    'http_errors_total': ('counter', "404 and 500 responses by status and path prefix"),
+    'db_read_routing_total': ('counter', "Read-only requests by database target and reason"),
+}
+
+
+def _series(name, **labels):
+    """Prometheus series name, also used as the key in the worker files"""
+    pairs = ','.join(f'{key}="{value}"' for key, value in sorted(labels.items()))
+    return f'{name}{{{pairs}}}'
+
+
+def _merge(into, data):
+    for key, value in data.get('counters', {}).items():
+        into['counters'][key] = into['counters'].get(key, 0) + value
+    for key, value in data.get('histograms', {}).items():
+        target = into['histograms'].setdefault(
+            key, {'buckets': [0] * (len(BUCKETS) + 1), 'sum': 0.0, 'count': 0})
+        target['buckets'] = [a + b for a, b in zip(target['buckets'], value['buckets'])]
+        target['sum'] += value['sum']
+        target['count'] += value['count']
+    return into
+
+
+def _empty():
+    return {'counters': {}, 'histograms': {}}
+
+
+def _read(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return _empty()
+
+
+def _write(path, data):
+    tmp = f'{path}.{os.getpid()}.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(data, f)
+    os.replace(tmp, path)
+
+
+def archive_worker(directory, pid):
+    """Fold the file of exited worker ``pid`` into the archive (run by the master)"""
+    path = os.path.join(directory, f'{pid}.json')
+    if not os.path.exists(path):
+        return
+    archive = os.path.join(directory, ARCHIVE)
+    _write(archive, _merge(_read(archive), _read(path)))
+    os.remove(path)
+
+
+def render_prometheus(data):
+    """Render merged counters and histograms in the Prometheus text format"""
+    lines = []
+    families = {}
+    for key in list(data['counters']) + list(data['histograms']):
+        families.setdefault(key.split('{', 1)[0], []).append(key)
+    for name in sorted(families):
+        kind, description = HELP.get(name, ('untyped', name))
+        lines.append(f'# HELP {name} {description}')
+        lines.append(f'# TYPE {name} {kind}')
+        for key in sorted(families[name]):
+            if key in data['counters']:
+                lines.append(f"{key} {data['counters'][key]}")
+                continue
+            histogram = data['histograms'][key]
+            labels = key[len(name) + 1:-1]
+            prefix = f'{labels},' if labels else ''
+            cumulative = 0
+            for bound, count in zip(BUCKETS + ('+Inf',), histogram['buckets']):
+                cumulative += count
+                lines.append(f'{name}_bucket{{{prefix}le="{bound}"}} {cumulative}')
+            lines.append(f"{name}_sum{{{labels}}} {histogram['sum']:.6f}")
+            lines.append(f"{name}_count{{{labels}}} {histogram['count']}")
+    return '\n'.join(lines) + '\n'
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context._metrics_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - context._metrics_started
+    if not has_app_context():
+        return
+    metrics = current_app.extensions.get('metrics')
+    if metrics is not None:
+        metrics.record_query(statement, elapsed)
+
+
+_engine_events = []
+
+
+def _listen_to_engines():
+    # Engine-wide, so every engine (and any added later) is measured once
+    if not _engine_events:
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+        _engine_events.append(True)
+
+
+class Metrics:
+    """Server-Timing headers and cross-worker Prometheus metrics"""
+
+    def __init__(self, app=None):
+        self._lock = threading.Lock()
+        self._data = _empty()
+        self._last_flush = time.monotonic()
+        self.directory = None
+        self.slow_query_seconds = None
+        self.flush_interval = 5
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        if not app.config.get('METRICS_DIR'):
+            app.config['METRICS_DIR'] = os.path.join(app.instance_path, 'metrics')
+        app.config.setdefault('METRICS_FLUSH_INTERVAL', 5)
+        app.config.setdefault('SLOW_QUERY_MS', 200)
+        app.config.setdefault('SERVER_TIMING', True)
+        self.directory = app.config['METRICS_DIR']
+        self.flush_interval = app.config['METRICS_FLUSH_INTERVAL']
+        self.slow_query_seconds = app.config['SLOW_QUERY_MS'] / 1000
+        self.server_timing = app.config['SERVER_TIMING']
+        os.makedirs(self.directory, exist_ok=True)
+        app.extensions['metrics'] = self
+
+        _listen_to_engines()
+        before_render_template.connect(self._template_started, app)
+        template_rendered.connect(self._template_finished, app)
+        app.before_request(self.before_request)
+        app.after_request(self.after_request)
+        app.add_url_rule('/metrics', 'metrics', self.view)
+
+    # Per-request accounting
+
+    def before_request(self):
+        # Requests the app makes to itself (static export) are not traffic
+        if request.environ.get('portfolio.internal'):
+            return
+        g.metrics = {'start': time.perf_counter(), 'queries': 0, 'db': 0.0,
+                     'templates': 0.0, 'rendering': []}
+
+    def record_query(self, statement, elapsed):
+        route = None
+        if has_request_context() and 'metrics' in g:
+            g.metrics['queries'] += 1
+            g.metrics['db'] += elapsed
+            route = self._route()
+        if elapsed >= self.slow_query_seconds:
+            current_app.logger.warning(
+                'Slow query (%.1f ms) on %s: %s', elapsed * 1000, route or '-',
+                ' '.join(statement.split())[:500])
+            with self._lock:
+                key = _series('db_slow_queries_total', route=route or '-')
+                self._data['counters'][key] = self._data['counters'].get(key, 0) + 1
+
+    def _template_started(self, sender, template, context, **extra):
+        if 'metrics' in g:
+            g.metrics['rendering'].append(time.perf_counter())
+
+    def _template_finished(self, sender, template, context, **extra):
+        if 'metrics' in g and g.metrics['rendering']:
+            started = g.metrics['rendering'].pop()
+            # Only the outermost render counts; nested renders are inside it
+            if not g.metrics['rendering']:
+                g.metrics['templates'] += time.perf_counter() - started
+
+    def increment(self, name, value=1, **labels):
+        """Add to a counter kept by another extension (see errors.py)"""
+        with self._lock:
+            key = _series(name, **labels)
+            self._data['counters'][key] = self._data['counters'].get(key, 0) + value
+        # Requests answered before before_request ran would otherwise never flush
+        if time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def _route(self):
+        # The URL rule, not the path, keeps the label set small
+        return request.url_rule.rule if request.url_rule is not None else 'unmatched'
+
+    def after_request(self, response):
+        timings = g.pop('metrics', None)
+        if timings is None:
+            return response
+        total = time.perf_counter() - timings['start']
+        if self.server_timing:
+            response.headers['Server-Timing'] = (
+                f"db;dur={timings['db'] * 1000:.1f};desc=\"{timings['queries']} SQL\", "
+                f"tpl;dur={timings['templates'] * 1000:.1f}, "
+                f"total;dur={total * 1000:.1f}")
+        route = self._route()
+        with self._lock:
+            counters = self._data['counters']
+            key = _series('http_requests_total', route=route, method=request.method,
+                          status=response.status_code)
+            counters[key] = counters.get(key, 0) + 1
+            key = _series('db_queries_total', route=route)
+            counters[key] = counters.get(key, 0) + timings['queries']
+            self._observe('http_request_duration_seconds', route, total)
+            self._observe('db_query_duration_seconds', route, timings['db'])
+            self._observe('template_render_duration_seconds', route, timings['templates'])
+        if time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+        return response
+
+    def _observe(self, name, route, value):
+        histogram = self._data['histograms'].setdefault(
+            _series(name, route=route),
+            {'buckets': [0] * (len(BUCKETS) + 1), 'sum': 0.0, 'count': 0})
+        for index, bound in enumerate(BUCKETS):
+            if value <= bound:
+                break
+        else:
+            index = len(BUCKETS)
+        histogram['buckets'][index] += 1
+        histogram['sum'] += value
+        histogram['count'] += 1
+
+    # Cross-worker aggregation
+
+    def flush(self):
+        """Write this worker's totals to its file in the metrics directory"""
+        with self._lock:
+            self._last_flush = time.monotonic()
+            snapshot = json.loads(json.dumps(self._data))
+        try:
+            _write(os.path.join(self.directory, f'{os.getpid()}.json'), snapshot)
+        except OSError:
+            # Metrics are best-effort; never fail the request over them
+            pass
+
+    def collect(self):
+        """Totals across live workers and the archive of exited ones"""
+        self.flush()
+        merged = _empty()
+        for name in os.listdir(self.directory):
+            if name.endswith('.json'):
+                _merge(merged, _read(os.path.join(self.directory, name)))
+        return merged
+
+    def view(self):
+        return Response(render_prometheus(self.collect()),
+                        mimetype='text/plain; version=0.0.4')
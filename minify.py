@@ -0,0 +1,317 @@
+"""
+CSS and JavaScript transforms for the asset build
+
+* ``minify_css`` / ``minify_js`` drop comments and redundant whitespace.
+  The JavaScript minifier keeps line breaks, so automatic semicolon
+  insertion behaves exactly as in the source.
+* ``prune_css`` drops selectors whose classes or ids appear in no template
+  or script. Classes built at runtime from a prefix (``flash-{{ category }}``,
+  `` `flash-${type}` ``) keep every selector with that prefix.
+* ``critical_css`` selects the rules that style a template's above-the-fold
+  markup: the nav in ``base.html`` and the leading ``<section>`` elements
+  of the page's content block. ``base.html`` inlines them and loads the full
+  stylesheet without blocking rendering.
+
+The CSS handling is a small parser for the subset this site uses (style
+rules, ``@media``/``@supports`` blocks and opaque at-rules such as
+``@keyframes``); it is not a general CSS implementation.
+"""
+
+import re
+
+STRING = re.compile(r'"(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\'', re.S)
+# At-rules whose body holds style rules rather than declarations
+NESTING_AT_RULES = ('@media', '@supports', '@document', '@layer')
+
+IDENTIFIER = re.compile(r'-?[A-Za-z_][\w-]*')
+# Pseudo-classes (with arguments) and attribute selectors say nothing about markup tokens
+SELECTOR_NOISE = re.compile(r'::?[\w-]+(?:\([^)]*\))?|\[[^\]]*\]')
+DYNAMIC_PREFIX = re.compile(r'([A-Za-z_][\w-]*-)(?:\{\{|\$\{)')
+# Selectors that apply to every page
+GLOBAL_TAGS = {'*', 'html', 'body', ''}
+# Template markup that roughly fills a first screen
+FOLD_CHARACTERS = 2000
+
+
+# CSS parsing
+
+def _strip_comments(css):
+    """Remove comments, leaving strings alone"""
+    parts = []
+    position = 0
+    for match in re.finditer(r'/\*.*?\*/|"(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\'', css, re.S):
+        parts.append(css[position:match.start()])
+        if not match.group().startswith('/*'):
+            parts.append(match.group())
+        position = match.end()
+    parts.append(css[position:])
+    return ''.join(parts)
+
+
+def _matching_brace(css, start):
+    """Index of the ``}`` closing the ``{`` at ``start``"""
+    depth = 0
+    position = start
+    while position < len(css):
+        char = css[position]
+        if char in '"\'':
+            position = STRING.match(css, position).end()
+            continue
+        if char == '{':
+            depth += 1
+        elif char == '}':
+            depth -= 1
+            if depth == 0:
+                return position
+        position += 1
+    raise ValueError('unbalanced braces in stylesheet')
+
+
+def parse_css(css):
+    """Parse a stylesheet into ``(kind, prelude, body)`` nodes.
+
+    ``kind`` is ``rule`` (body: declarations), ``block`` (a nesting at-rule;
+    body: child nodes), ``at`` (any other at-rule; body: raw text) or
+    ``statement`` (``@import`` and friends; body: None).
+    """
+    css = _strip_comments(css)
+    nodes = []
+    position = 0
+    while True:
+        while position < len(css) and css[position].isspace():
+            position += 1
+        if position >= len(css):
+            return nodes
+        brace = css.find('{', position)
+        semicolon = css.find(';', position)
+        if css[position] == '@' and semicolon != -1 and (brace == -1 or semicolon < brace):
+            nodes.append(('statement', css[position:semicolon].strip(), None))
+            position = semicolon + 1
+            continue
+        if brace == -1:
+            return nodes
+        prelude = css[position:brace].strip()
+        end = _matching_brace(css, brace)
+        body = css[brace + 1:end]
+        if prelude.startswith(NESTING_AT_RULES):
+            nodes.append(('block', prelude, parse_css(body)))
+        elif prelude.startswith('@'):
+            nodes.append(('at', prelude, body))
+        else:
+            nodes.append(('rule', prelude, body))
+        position = end + 1
+
+
+# Minification
+
+def _squeeze(text, punctuation):
+    """Collapse whitespace and drop it around ``punctuation``, outside strings"""
+    parts = []
+    position = 0
+    pattern = re.compile(r'\s*([' + re.escape(punctuation) + r'])\s*')
+    for match in STRING.finditer(text):
+        parts.append(pattern.sub(r'\1', re.sub(r'\s+', ' ', text[position:match.start()])))
+        parts.append(match.group())
+        position = match.end()
+    parts.append(pattern.sub(r'\1', re.sub(r'\s+', ' ', text[position:])))
+    return ''.join(parts).strip()
+
+
+def _minify_selector(selector):
+    return _squeeze(selector, ',>~+')
+
+
+def _minify_declarations(body):
+    # Not around + and -: calc() needs the spaces
+    return _squeeze(body, ':;,{}').rstrip(';')
+
+
+def serialize_css(nodes):
+    """Minified text for parsed ``nodes``"""
+    out = []
+    for kind, prelude, body in nodes:
+        if kind == 'statement':
+            out.append(_squeeze(prelude, ',') + ';')
+        elif kind == 'block':
+            children = serialize_css(body)
+            if children:
+                out.append(f'{_squeeze(prelude, ",:")}{{{children}}}')
+        elif kind == 'at':
+            out.append(f'{_squeeze(prelude, ",")}{{{_minify_declarations(body)}}}')
+        else:
+            declarations = _minify_declarations(body)
+            if declarations:
+                out.append(f'{_minify_selector(prelude)}{{{declarations}}}')
+    return ''.join(out)
+
+
+def minify_css(css):
+    return serialize_css(parse_css(css))
+
+
+def minify_js(js):
+    """Drop comments and indentation; strings, template literals and regexes are kept"""
+    out = []
+    position = 0
+    length = len(js)
+    last_significant = ''
+    while position < length:
+        char = js[position]
+        if char in '"\'`':
+            end = position + 1
+            while end < length and js[end] != char:
+                end += 2 if js[end] == '\\' else 1
+            out.append(js[position:end + 1])
+            last_significant = char
+            position = end + 1
+        elif js.startswith('//', position):
+            end = js.find('\n', position)
+            position = length if end == -1 else end
+        elif js.startswith('/*', position):
+            end = js.find('*/', position + 2)
+            position = length if end == -1 else end + 2
+            out.append(' ')
+        elif char == '/' and (not last_significant or last_significant in '(,=:[!&|?{};+-*%<>~^'):
+            # A regular expression literal, not a division
+            end = position + 1
+            in_class = False
+            while end < length and (js[end] != '/' or in_class):
+                if js[end] == '\\':
+                    end += 1
+                elif js[end] == '[':
+                    in_class = True
+                elif js[end] == ']':
+                    in_class = False
+                end += 1
+            match = re.compile(r'[a-z]*').match(js, end + 1)
+            out.append(js[position:match.end()])
+            last_significant = '/'
+            position = match.end()
+        elif char.isspace():
+            end = position
+            while end < length and js[end].isspace():
+                end += 1
+            out.append('\n' if '\n' in js[position:end] else ' ')
+            position = end
+        else:
+            out.append(char)
+            last_significant = char
+            position += 1
+    lines = (line.strip() for line in ''.join(out).split('\n'))
+    return '\n'.join(line for line in lines if line) + '\n'
+
+
+# Pruning and critical CSS
+
+def markup_tokens(text):
+    """Words that may name a class, id or tag in ``text``, plus dynamic class prefixes"""
+    return set(re.findall(r'[\w-]+', text)), set(DYNAMIC_PREFIX.findall(text))
+
+
+def _compounds(selector):
+    """``(tag, classes and ids)`` for each compound selector in ``selector``"""
+    selector = SELECTOR_NOISE.sub('', selector)
+    for compound in re.split(r'\s*[\s>+~]\s*', selector.strip()):
+        tag = IDENTIFIER.match(compound)
+        names = re.findall(r'[.#](-?[A-Za-z_][\w-]*)', compound)
+        yield (tag.group().lower() if tag else ('*' if compound.startswith('*') else '')), names
+
+
+def _known(name, words, prefixes):
+    return name in words or any(name.startswith(prefix) for prefix in prefixes)
+
+
+def selector_used(selector, words, prefixes, check_tags=False):
+    """Whether every class and id (and tag, with ``check_tags``) in ``selector`` occurs"""
+    for tag, names in _compounds(selector):
+        if check_tags and tag not in GLOBAL_TAGS and tag not in words:
+            return False
+        if not all(_known(name, words, prefixes) for name in names):
+            return False
+    return True
+
+
+def _filter(nodes, keep, check_tags=False):
+    kept = []
+    for kind, prelude, body in nodes:
+        if kind == 'rule':
+            selectors = [s for s in _split_selectors(prelude)
+                         if selector_used(s, *keep, check_tags=check_tags)]
+            if selectors:
+                kept.append((kind, ', '.join(selectors), body))
+        elif kind == 'block':
+            children = _filter(body, keep, check_tags)
+            if children:
+                kept.append((kind, prelude, children))
+        else:
+            kept.append((kind, prelude, body))
+    return kept
+
+
+def _split_selectors(prelude):
+    # Commas inside :is()/:not() arguments do not separate selectors
+    selectors, depth, current = [], 0, []
+    for char in prelude:
+        if char == ',' and depth == 0:
+            selectors.append(''.join(current).strip())
+            current = []
+            continue
+        depth += char == '('
+        depth -= char == ')'
+        current.append(char)
+    selectors.append(''.join(current).strip())
+    return [selector for selector in selectors if selector]
+
+
+def _drop_unused_keyframes(nodes):
+    """Remove @keyframes that no remaining declaration refers to"""
+    used = set()
+
+    def collect(nodes):
+        for kind, prelude, body in nodes:
+            if kind == 'rule':
+                used.update(re.findall(r'[\w-]+', body))
+            elif kind == 'block':
+                collect(body)
+    collect(nodes)
+
+    def keep(nodes):
+        kept = []
+        for kind, prelude, body in nodes:
+            if kind == 'at' and 'keyframes' in prelude.split()[0]:
+                if prelude.split()[-1] not in used:
+                    continue
+            elif kind == 'block':
+                body = keep(body)
+            kept.append((kind, prelude, body))
+        return kept
+    return keep(nodes)
+
+
+def prune_css(nodes, words, prefixes):
+    """Keep the rules whose selectors can match markup built from ``words``"""
+    return _drop_unused_keyframes(_filter(nodes, (words, prefixes)))
+
+
+def critical_css(nodes, words, prefixes):
+    """The rules needed for markup made of ``words``, including element rules"""
+    kept = _filter(nodes, (words, prefixes), check_tags=True)
+    # Statements (@import), font faces and the animations the kept rules use
+    kept = [node for node in kept
+            if node[0] != 'at' or node[1] == '@font-face' or 'keyframes' in node[1].split()[0]]
+    return _drop_unused_keyframes(kept)
+
+
+def above_the_fold(base_source, page_source, fold=FOLD_CHARACTERS):
+    """The markup a page shows first: the layout before the content block,
+    then whole sections of the page's content until ``fold`` characters"""
+    head = base_source.split('{% block content %}', 1)[0]
+    head = head.split('<body', 1)[-1]
+    content = page_source.split('{% block content %}', 1)[-1]
+    end = 0
+    while end < fold:
+        next_end = content.find('</section>', end)
+        if next_end == -1:
+            return head + content[:max(end, fold)]
+        end = next_end + len('</section>')
+    return head + content[:end]
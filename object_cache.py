@@ -0,0 +1,258 @@
+"""
+Shared object cache for the Portfolio Website
+
+A read-through key/value cache for database rows and rendered fragments,
+with a TTL per entry and explicit invalidation. ``OBJECT_CACHE_BACKEND``
+picks where entries live:
+
+* ``memory`` - a per-process LRU (fastest, but every worker has its own)
+* ``sqlite`` - a WAL-mode SQLite file in the instance folder, shared by
+  all workers on the node (the default)
+* ``redis`` - a Redis server at ``OBJECT_CACHE_REDIS_URL`` (needs the
+  ``redis`` package), shared by every node
+* ``none`` - caching disabled
+
+Lookups that find nothing are cached too, for a shorter TTL, so requests
+for ids that do not exist stop reaching the database. Backend failures are
+treated as misses; the cache never fails a request.
+"""
+
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import nullcontext
+
+try:
+    import redis
+except ImportError:  # Only needed for OBJECT_CACHE_BACKEND=redis
+    redis = None
+
+# Stored in place of a value when the loader found nothing
+NEGATIVE = ('object-cache', 'negative')
+
+
+class NullBackend:
+    def get(self, key):
+        return None
+
+    def set(self, key, value, ttl):
+        pass
+
+    def delete(self, keys):
+        pass
+
+    def clear(self):
+        pass
+
+
+class MemoryBackend:
+    """Per-process LRU with expiry"""
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires = entry
+            if expires < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, keys):
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class SQLiteBackend:
+    """Entries in a local SQLite file, shared by every process on the node"""
+
+    # Expired rows are swept after this many writes
+    PURGE_EVERY = 1000
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._writes = 0
+
+    def _connection(self):
+        # One connection per thread, reopened after a fork
+        connection = getattr(self._local, 'connection', None)
+        if connection is None or self._local.pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=1, isolation_level=None,
+                                         check_same_thread=False)
+            connection.execute('PRAGMA journal_mode = WAL')
+            # Losing recent entries in a crash is harmless for a cache
+            connection.execute('PRAGMA synchronous = OFF')
+            connection.execute('CREATE TABLE IF NOT EXISTS cache ('
+                               'key TEXT PRIMARY KEY, value BLOB NOT NULL, expires REAL NOT NULL)')
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+    def get(self, key):
+        row = self._connection().execute(
+            'SELECT value FROM cache WHERE key = ? AND expires > ?', (key, time.time())).fetchone()
+        return pickle.loads(row[0]) if row else None
+
+    def set(self, key, value, ttl):
+        connection = self._connection()
+        connection.execute('INSERT OR REPLACE INTO cache (key, value, expires) VALUES (?, ?, ?)',
+                           (key, pickle.dumps(value, pickle.HIGHEST_PROTOCOL), time.time() + ttl))
+        self._writes += 1
+        if self._writes % self.PURGE_EVERY == 0:
+            connection.execute('DELETE FROM cache WHERE expires <= ?', (time.time(),))
+
+    def delete(self, keys):
+        keys = list(keys)
+        if keys:
+            self._connection().execute(
+                f"DELETE FROM cache WHERE key IN ({', '.join('?' * len(keys))})", keys)
+
+    def clear(self):
+        self._connection().execute('DELETE FROM cache')
+
+
+class RedisBackend:
+    """Entries in Redis under ``prefix``, shared across nodes"""
+
+    def __init__(self, url, prefix='portfolio:'):
+        if redis is None:
+            raise RuntimeError("OBJECT_CACHE_BACKEND=redis requires the redis package")
+        self.client = redis.Redis.from_url(url, socket_timeout=0.5)
+        self.prefix = prefix
+
+    def get(self, key):
+        value = self.client.get(self.prefix + key)
+        return pickle.loads(value) if value is not None else None
+
+    def set(self, key, value, ttl):
+        self.client.set(self.prefix + key, pickle.dumps(value, pickle.HIGHEST_PROTOCOL),
+                        px=int(ttl * 1000))
+
+    def delete(self, keys):
+        keys = [self.prefix + key for key in keys]
+        if keys:
+            self.client.delete(*keys)
+
+    def clear(self):
+        for key in self.client.scan_iter(match=self.prefix + '*', count=500):
+            self.client.delete(key)
+
+
+class ObjectCache:
+    """Read-through cache with negative entries over a pluggable backend"""
+
+    def __init__(self, app=None):
+        self.backend = NullBackend()
+        self.ttl = 300
+        self.negative_ttl = 60
+        # Set by the app: where loaders run on a miss
+        self.fill_context = nullcontext
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+        self.errors = 0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('OBJECT_CACHE_BACKEND', 'sqlite')
+        app.config.setdefault('OBJECT_CACHE_TTL', 300)
+        app.config.setdefault('OBJECT_CACHE_NEGATIVE_TTL', 60)
+        app.config.setdefault('OBJECT_CACHE_SIZE', 1024)
+        app.config.setdefault('OBJECT_CACHE_REDIS_URL', 'redis://localhost:6379/0')
+        self.ttl = app.config['OBJECT_CACHE_TTL']
+        self.negative_ttl = app.config['OBJECT_CACHE_NEGATIVE_TTL']
+        self.backend = self._make_backend(app)
+        app.extensions['object_cache'] = self
+
+    def _make_backend(self, app):
+        name = app.config['OBJECT_CACHE_BACKEND']
+        if name == 'memory':
+            return MemoryBackend(app.config['OBJECT_CACHE_SIZE'])
+        if name == 'sqlite':
+            path = app.config.get('OBJECT_CACHE_PATH')
+            if not path:
+                os.makedirs(app.instance_path, exist_ok=True)
+                path = os.path.join(app.instance_path, 'object-cache.db')
+            return SQLiteBackend(path)
+        if name == 'redis':
+            return RedisBackend(app.config['OBJECT_CACHE_REDIS_URL'])
+        return NullBackend()
+
+    def get(self, key):
+        try:
+            return self.backend.get(key)
+        except Exception:
+            self.errors += 1
+            return None
+
+    def set(self, key, value, ttl=None):
+        try:
+            self.backend.set(key, value, ttl or self.ttl)
+        except Exception:
+            self.errors += 1
+
+    def get_or_load(self, key, loader, ttl=None):
+        """Return the cached value for ``key``, calling ``loader`` on a miss.
+
+        A ``None`` from the loader is remembered for ``negative_ttl`` seconds.
+        """
+        value = self.get(key)
+        if value == NEGATIVE:
+            self.negative_hits += 1
+            return None
+        if value is not None:
+            self.hits += 1
+            return value
+        self.misses += 1
+        with self.fill_context():
+            value = loader()
+        if value is None:
+            self.set(key, NEGATIVE, self.negative_ttl)
+        else:
+            self.set(key, value, ttl)
+        return value
+
+    def delete(self, *keys):
+        try:
+            self.backend.delete(keys)
+        except Exception:
+            self.errors += 1
+
+    def clear(self):
+        try:
+            self.backend.clear()
+        except Exception:
+            self.errors += 1
+
+    def stats(self):
+        return {
+            'backend': type(self.backend).__name__,
+            'hits': self.hits,
+            'negative_hits': self.negative_hits,
+            'misses': self.misses,
+            'errors': self.errors,
+        }
@@ -0,0 +1,146 @@
+"""
+Full-page response cache for the Portfolio Website
+
+Each worker keeps a bounded LRU of rendered pages. Invalidation clears the
+local entries and bumps a stamp file in the instance folder, which the
+other gunicorn workers notice with a single stat() on their next lookup.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import nullcontext
+from functools import wraps
+
+from flask import g, make_response, request, session
+
+from stamps import Stamp
+
+
+class CachedPage:
+    """A rendered response body plus the headers needed to replay it"""
+
+    __slots__ = ('body', 'status', 'headers', 'created', 'variants')
+
+    def __init__(self, body, status, headers):
+        self.body = body
+        self.status = status
+        self.headers = headers
+        self.created = time.monotonic()
+        # Alternative encodings of ``body`` keyed by content-coding
+        self.variants = {}
+
+    def to_response(self):
+        return make_response(self.body, self.status, self.headers)
+
+
+class PageCache:
+    """Per-process LRU cache of full GET responses keyed by endpoint and URL"""
+
+    def __init__(self, app=None):
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.max_entries = 64
+        self.ttl = None
+        self.stamp = Stamp()
+        # Set by the app: where misses are rendered, and who must not get shared pages
+        self.fill_context = nullcontext
+        self.bypass = lambda: False
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('PAGE_CACHE_SIZE', 64)
+        app.config.setdefault('PAGE_CACHE_TTL', 300)
+        self.max_entries = app.config['PAGE_CACHE_SIZE']
+        self.ttl = app.config['PAGE_CACHE_TTL'] or None
+        os.makedirs(app.instance_path, exist_ok=True)
+        self.stamp = Stamp(os.path.join(app.instance_path, 'page-cache.stamp'))
+
+    def cached(self, view):
+        """Decorator serving ``view`` from the cache when possible"""
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            # Pending flash messages make the page specific to this visitor
+            if (request.method != 'GET' or '_flashes' in session or not self.max_entries
+                    or self.bypass()):
+                return view(*args, **kwargs)
+
+            key = (request.endpoint, request.full_path)
+            entry = self.get(key)
+            if entry is not None:
+                # Lets the compression layer reuse encoded variants of the entry
+                g.page_cache_entry = entry
+                return entry.to_response()
+
+            with self.fill_context():
+                response = make_response(view(*args, **kwargs))
+            # A modified session means the render consumed or set something
+            # per-visitor (e.g. a flash), so the page must not be shared.
+            if response.status_code == 200 and not response.is_streamed and not session.modified:
+                entry = CachedPage(
+                    response.get_data(),
+                    response.status_code,
+                    [('Content-Type', response.headers['Content-Type'])],
+                )
+                self.set(key, entry)
+                g.page_cache_entry = entry
+            return response
+        return wrapper
+
+    def get(self, key):
+        self._check_stamp()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self.ttl and time.monotonic() - entry.created > self.ttl:
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def set(self, key, entry):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, *endpoints):
+        """Drop cached pages for ``endpoints`` (all pages if none given)"""
+        with self._lock:
+            if endpoints:
+                for key in [key for key in self._entries if key[0] in endpoints]:
+                    del self._entries[key]
+            else:
+                self._entries.clear()
+        self.stamp.bump()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+            }
+
+    def _check_stamp(self):
+        """Clear everything if another worker invalidated since our last look"""
+        if self.stamp.changed():
+            self.clear()
@@ -0,0 +1,88 @@
+"""
+Keyset (cursor) pagination for the Portfolio Website
+
+Pages are addressed by the ``(date_posted, id)`` of the row at their edge
+instead of an OFFSET, so fetching page 10,000 costs the same index range
+scan as fetching page 1.
+"""
+
+import base64
+import binascii
+from datetime import datetime
+
+from sqlalchemy import tuple_
+
+
+class InvalidCursor(ValueError):
+    """Raised when a cursor from the query string cannot be decoded"""
+
+
+def encode_cursor(post):
+    """Encode the sort key of a post into an opaque, URL-safe cursor"""
+    raw = f"{post.date_posted.isoformat()}|{post.id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Decode a cursor back into a ``(date_posted, id)`` tuple"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode()).decode()
+        stamp, post_id = raw.rsplit('|', 1)
+        return datetime.fromisoformat(stamp), int(post_id)
+    except (ValueError, binascii.Error, UnicodeDecodeError) as e:
+        raise InvalidCursor(cursor) from e
+
+
+class KeysetPage:
+    """One page of posts plus the cursors needed to reach its neighbours"""
+
+    def __init__(self, items, next_cursor=None, prev_cursor=None):
+        self.items = items
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_prev(self):
+        return self.prev_cursor is not None
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+
+def paginate_posts(query, model, per_page, after=None, before=None):
+    """Return a KeysetPage of ``query`` ordered newest first.
+
+    ``after`` walks towards older posts and ``before`` towards newer ones.
+    Both are cursors produced by :func:`encode_cursor`. One extra row is
+    fetched to find out whether another page exists in that direction.
+    """
+    key = tuple_(model.date_posted, model.id)
+
+    if before:
+        # Walk the index backwards, then flip the rows into display order
+        rows = (query.filter(key > tuple_(*decode_cursor(before)))
+                .order_by(model.date_posted.asc(), model.id.asc())
+                .limit(per_page + 1).all())
+        has_more = len(rows) > per_page
+        items = list(reversed(rows[:per_page]))
+        prev_cursor = encode_cursor(items[0]) if items and has_more else None
+        next_cursor = encode_cursor(items[-1]) if items else None
+        return KeysetPage(items, next_cursor=next_cursor, prev_cursor=prev_cursor)
+
+    if after:
+        query = query.filter(key < tuple_(*decode_cursor(after)))
+    rows = (query.order_by(model.date_posted.desc(), model.id.desc())
+            .limit(per_page + 1).all())
+    has_more = len(rows) > per_page
+    items = rows[:per_page]
+    next_cursor = encode_cursor(items[-1]) if items and has_more else None
+    prev_cursor = encode_cursor(items[0]) if items and after else None
+    return KeysetPage(items, next_cursor=next_cursor, prev_cursor=prev_cursor)
@@ -13,17 +13,9 @@ def main():
     print(f"🚀 Starting portfolio website on port {port}")
     print(f"📊 Environment: {'Production' if os.environ.get('RENDER') else 'Development'}")
     
-    # Gunicorn command with explicit port binding
-    cmd = [
-        'gunicorn',
-        'app:app',
-        '--bind', f'0.0.0.0:{port}',
-        '--workers', '1',
-        '--timeout', '120',
-        '--access-logfile', '-',
-        '--error-logfile', '-',
-        '--log-level', 'info'
-    ]
+    # gunicorn.conf.py binds to $PORT and picks the concurrency profile
+    # (GUNICORN_PROFILE, WEB_CONCURRENCY, GUNICORN_THREADS)
+    cmd = ['gunicorn', 'app:app', '-c', 'gunicorn.conf.py']
     
     print(f"🔧 Command: {' '.join(cmd)}")
     
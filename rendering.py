@@ -0,0 +1,87 @@
+"""
+Write-time Markdown rendering for blog posts
+
+Post bodies are Markdown. They are rendered to sanitized HTML (with
+Pygments highlighting for fenced code and a table of contents) when a post
+is saved, and the result is stored on the row, so serving a post costs no
+parsing. Bump RENDERER_VERSION whenever the output changes and run
+``python setup.py rerender`` to regenerate stored HTML.
+"""
+
+from html import unescape
+
+import bleach
+import markdown
+from markdown.extensions.toc import slugify
+from pygments.token import STANDARD_TYPES
+
+RENDERER_VERSION = 3
+
+MARKDOWN_EXTENSIONS = ['fenced_code', 'codehilite', 'tables', 'toc', 'sane_lists', 'nl2br']
+# Enough to tell markup from text; no highlighting, since only the words are kept
+PLAIN_TEXT_EXTENSIONS = ['fenced_code', 'tables', 'sane_lists']
+MARKDOWN_CONFIG = {
+    'codehilite': {'guess_lang': False, 'css_class': 'codehilite'},
+    'toc': {'toc_depth': '2-3', 'slugify': lambda value, separator:
+            HEADING_ID_PREFIX + slugify(value, separator)},
+}
+
+# Posts come from visitors: heading ids are prefixed so they cannot clobber
+# the layout's ids, and classes are limited to what code highlighting emits
+HEADING_ID_PREFIX = 'post-'
+HEADINGS = {'h1', 'h2', 'h3', 'h4', 'h5', 'h6'}
+ALLOWED_CLASSES = {
+    'div': {'codehilite', 'toc'},
+    'span': set(STANDARD_TYPES.values()) - {''},
+}
+
+ALLOWED_TAGS = [
+    'a', 'abbr', 'b', 'blockquote', 'br', 'code', 'del', 'div', 'em', 'h1', 'h2',
+    'h3', 'h4', 'h5', 'h6', 'hr', 'i', 'img', 'li', 'ol', 'p', 'pre', 'span',
+    'strong', 'sub', 'sup', 'table', 'tbody', 'td', 'th', 'thead', 'tr', 'ul',
+]
+ALLOWED_ATTRIBUTES = {
+    'a': ['href', 'title'],
+    'abbr': ['title'],
+    'img': ['src', 'alt', 'title'],
+}
+ALLOWED_PROTOCOLS = ['http', 'https', 'mailto']
+
+
+def _allowed_attribute(tag, name, value):
+    if name in ALLOWED_ATTRIBUTES.get(tag, ()):
+        return True
+    if name == 'id':
+        return tag in HEADINGS and value.startswith(HEADING_ID_PREFIX)
+    if name == 'class':
+        return value in ALLOWED_CLASSES.get(tag, ())
+    return False
+
+
+def sanitize(html):
+    return bleach.clean(html, tags=ALLOWED_TAGS, attributes=_allowed_attribute,
+                        protocols=ALLOWED_PROTOCOLS, strip=True)
+
+
+def render_markdown(text):
+    """Return ``(content_html, toc_html)``; toc_html is None without headings"""
+    md = markdown.Markdown(extensions=MARKDOWN_EXTENSIONS, extension_configs=MARKDOWN_CONFIG)
+    html = sanitize(md.convert(text or ''))
+    toc = sanitize(md.toc) if '<li>' in md.toc else None
+    return html, toc
+
+
+def plain_text(text):
+    """Markdown ``text`` as plain text, for excerpts and word counts"""
+    html = markdown.markdown(text or '', extensions=PLAIN_TEXT_EXTENSIONS)
+    return ' '.join(unescape(bleach.clean(html, tags=[], strip=True)).split())
+
+
+def render_fields(text):
+    """BlogPost column values produced by rendering ``text``"""
+    html, toc = render_markdown(text)
+    return {
+        'content_html': html,
+        'toc_html': toc,
+        'render_version': RENDERER_VERSION,
+    }
@@ -0,0 +1,259 @@
+"""
+Read-replica routing for the Portfolio Website
+
+With ``DATABASE_REPLICA_URLS`` set, every replica becomes a Flask-SQLAlchemy
+bind (``replica0``, ``replica1``...), and ``db.session`` is a
+``RoutingSession``. Views decorated with ``@replicas.read_only`` (home,
+the blog listings, a post) send their SELECTs to one replica per request,
+round-robin. Everything else goes to the primary: writes and flushes,
+other views, background jobs and the CLI.
+
+Replicas lag behind the primary. After a request commits a write, its
+visitor is pinned to the primary for ``REPLICA_PIN_SECONDS`` (a timestamp
+in the signed session cookie), so an author sees a new post straight away.
+
+Each worker checks a replica with ``SELECT 1`` at most once every
+``REPLICA_CHECK_SECONDS``. A replica that fails the check, or fails a
+query, is skipped until its next check. A read-only view whose queries
+failed on a replica is run again on the primary, so the visitor never sees
+the failure. With no healthy replica, reads go to the primary.
+
+Caches shared between visitors (page and object cache) are filled inside
+``replicas.primary()``, so a lagging replica never stores an old row or a
+"no such post" entry for everyone; a pinned visitor also skips the page
+cache, which is invalidated by a background job after the write.
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+from flask import current_app, g, has_request_context, jsonify, request, session
+from flask.globals import request_ctx
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.sql import CompoundSelect, Select
+
+from engine_profiles import apply_engine_profile, engine_options
+
+REPLICA = 'replica_engine'
+WROTE = 'replica_wrote'
+PIN_KEY = 'db_primary_until'
+
+
+class RoutingSession(Session):
+    """``db.session`` that sends a read-only request's SELECTs to its replica"""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        replica = self.info.get(REPLICA)
+        if (replica is not None and bind is None and not self._flushing
+                and isinstance(clause, (Select, CompoundSelect))):
+            return replica
+        if self._flushing or getattr(clause, 'is_dml', False):
+            self.info[WROTE] = True
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+class Replicas:
+    """Replica binds, health checks, primary pinning and the read_only decorator"""
+
+    def __init__(self, app=None, db=None):
+        self.db = db
+        self.keys = []
+        self.pin_seconds = 5
+        self.check_seconds = 10
+        self._lock = threading.Lock()
+        self._state = {}
+        self._next = 0
+        if app is not None:
+            self.init_app(app, db)
+
+    def init_app(self, app, db=None):
+        """Register the replica binds; call before ``db.init_app``"""
+        app.config.setdefault('DATABASE_REPLICA_URLS', [])
+        app.config.setdefault('REPLICA_PIN_SECONDS', 5)
+        app.config.setdefault('REPLICA_CHECK_SECONDS', 10)
+        self.db = db or self.db
+        self.pin_seconds = app.config['REPLICA_PIN_SECONDS']
+        self.check_seconds = app.config['REPLICA_CHECK_SECONDS']
+        urls = app.config['DATABASE_REPLICA_URLS']
+        self.keys = [f'replica{index}' for index in range(len(urls))]
+        binds = app.config.setdefault('SQLALCHEMY_BINDS', {})
+        for key, url in zip(self.keys, urls):
+            binds[key] = dict(engine_options(url, app.config), url=url)
+        self._state = {key: {'healthy': True, 'checked_at': None, 'error': None, 'reads': 0}
+                       for key in self.keys}
+        app.extensions['replicas'] = self
+        app.add_url_rule('/health/replicas', 'replica_status', self.view)
+        if not event.contains(self.db.session, 'after_commit', self._after_commit):
+            event.listen(self.db.session, 'after_commit', self._after_commit)
+            event.listen(self.db.session, 'after_rollback', self._after_rollback)
+
+    def setup_engines(self):
+        """Tune the replica engines like the primary; call after ``db.init_app``"""
+        for key in self.keys:
+            engine = self.db.engines[key]
+            apply_engine_profile(engine, current_app.config)
+            event.listen(engine, 'handle_error', self._on_error)
+
+    # Routing
+
+    def read_only(self, view):
+        """Decorator letting ``view`` read from a replica"""
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            # The static export is rebuilt after a write and must include it
+            if not self.keys or request.environ.get('portfolio.internal'):
+                return view(*args, **kwargs)
+            try:
+                return self._run(view, args, kwargs)
+            finally:
+                # Routing ends with the view, even where the session outlives the request
+                self.db.session.info.pop(REPLICA, None)
+        return wrapper
+
+    def _run(self, view, args, kwargs):
+        self._route_reads()
+        flashes = list(session.get('_flashes', []))
+        try:
+            response = view(*args, **kwargs)
+            if not g.pop('replica_failed', False):
+                return response
+        except DBAPIError:
+            if not g.pop('replica_failed', False):
+                raise
+        # The view may have caught the error itself; answer from the primary instead
+        self.db.session.rollback()
+        self.db.session.info[REPLICA] = None
+        if flashes:
+            session['_flashes'] = flashes
+        else:
+            session.pop('_flashes', None)
+        # get_flashed_messages() caches what the first run's template read
+        request_ctx.flashes = None
+        self._count('primary', 'failover')
+        return view(*args, **kwargs)
+
+    @contextmanager
+    def primary(self):
+        """Send the session's reads to the primary inside the block"""
+        info = self.db.session.info
+        replica = info.get(REPLICA)
+        if replica is None:
+            yield
+            return
+        info[REPLICA] = None
+        self._count('primary', 'cache_fill')
+        try:
+            yield
+        finally:
+            info[REPLICA] = replica
+
+    def pinned(self):
+        """True while this visitor reads from the primary after a write"""
+        return has_request_context() and session.get(PIN_KEY, 0) > time.time()
+
+    def _route_reads(self):
+        if self.pinned():
+            self._count('primary', 'pinned')
+            return
+        key = self.choose()
+        # A failed health check in choose() is not a failed read
+        g.pop('replica_failed', None)
+        if key is None:
+            self._count('primary', 'no_healthy_replica')
+            return
+        self.db.session.info[REPLICA] = self.db.engines[key]
+        with self._lock:
+            self._state[key]['reads'] += 1
+        self._count(key, 'replica')
+
+    def choose(self):
+        """Next healthy replica in round-robin order, or None"""
+        for _ in range(len(self.keys)):
+            with self._lock:
+                key = self.keys[self._next % len(self.keys)]
+                self._next += 1
+            if self.healthy(key):
+                return key
+        return None
+
+    def healthy(self, key):
+        state = self._state[key]
+        checked_at = state['checked_at']
+        if checked_at is None or time.monotonic() - checked_at >= self.check_seconds:
+            self.check(key)
+        return state['healthy']
+
+    def check(self, key):
+        """Run ``SELECT 1`` on replica ``key`` and record the result"""
+        try:
+            with self.db.engines[key].connect() as connection:
+                connection.exec_driver_sql('SELECT 1')
+            self._mark(key, True)
+        except Exception as e:
+            self._mark(key, False, e)
+
+    def _mark(self, key, healthy, error=None):
+        state = self._state[key]
+        if state['healthy'] and not healthy:
+            current_app.logger.warning('Replica %s unhealthy, reading from the primary: %s',
+                                       key, error)
+        state.update(healthy=healthy, checked_at=time.monotonic(),
+                     error=type(error).__name__ if error else None)
+
+    def _on_error(self, context):
+        key = next((key for key in self.keys if self.db.engines[key] is context.engine), None)
+        if key is not None:
+            self._mark(key, False, context.original_exception)
+            if has_request_context():
+                g.replica_failed = True
+
+    def _count(self, target, reason):
+        metrics = current_app.extensions.get('metrics')
+        if metrics is not None:
+            metrics.increment('db_read_routing_total', target=target, reason=reason)
+
+    # Pinning
+
+    def _after_commit(self, db_session):
+        if db_session.info.pop(WROTE, False) and has_request_context() and self.keys:
+            session[PIN_KEY] = time.time() + self.pin_seconds
+
+    def _after_rollback(self, db_session):
+        db_session.info.pop(WROTE, None)
+
+    def sync_sqlite(self):
+        """Copy the primary into every SQLite replica (local stand-ins); return their keys"""
+        primary = self.db.engine
+        copied = []
+        for key in self.keys:
+            replica = self.db.engines[key]
+            if primary.dialect.name != 'sqlite' or replica.dialect.name != 'sqlite':
+                continue
+            source, target = primary.raw_connection(), replica.raw_connection()
+            try:
+                source.driver_connection.backup(target.driver_connection)
+            finally:
+                target.close()
+                source.close()
+            copied.append(key)
+        return copied
+
+    # Status
+
+    def status(self):
+        now = time.monotonic()
+        return {key: {
+            'healthy': state['healthy'],
+            'error': state['error'],
+            'checked_s_ago': round(now - state['checked_at'], 1) if state['checked_at'] else None,
+            'reads': state['reads'],
+        } for key, state in self._state.items()}
+
+    def view(self):
+        response = jsonify({'replicas': self.status(), 'pin_seconds': self.pin_seconds})
+        response.cache_control.no_store = True
+        return response
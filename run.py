@@ -6,6 +6,12 @@ Simple script to start the Flask development server with proper configuration.
 
 import os
 import sys
+
+from config import config_name
+
+# A local launcher: development unless the environment picks a configuration
+os.environ.setdefault('FLASK_CONFIG', config_name('development'))
+
 from app import app, db
 
 def setup_database():
@@ -0,0 +1,178 @@
+"""
+Full-text search over blog posts
+
+SQLite databases get an external-content FTS5 table ranked with bm25().
+PostgreSQL databases get a generated ``tsvector`` column with a GIN index,
+ranked with ts_rank_cd(). Other backends fall back to a LIKE scan.
+Snippets come back as HTML with matches wrapped in ``<mark>``.
+"""
+
+import re
+
+from markupsafe import escape, Markup
+from sqlalchemy import DateTime, Float, Integer, String, bindparam, text
+
+FTS_TABLE = 'blog_post_fts'
+PG_INDEX = 'ix_blog_post_search'
+
+# Private-use code points that never occur in post text; they mark matches
+# in snippets until the snippet has been HTML-escaped.
+MARK_START = '\ue000'
+MARK_END = '\ue001'
+
+SNIPPET_WORDS = 32
+# bm25() weight of a title match relative to a body match
+TITLE_WEIGHT = 10.0
+
+
+class SearchResult:
+    """A ranked hit: post metadata plus a highlighted snippet"""
+
+    def __init__(self, id, title, date_posted, snippet, rank):
+        self.id = id
+        self.title = title
+        self.date_posted = date_posted
+        self.snippet = _highlight(snippet)
+        self.rank = rank
+
+
+def _highlight(snippet):
+    return Markup(str(escape(snippet or ''))
+                  .replace(MARK_START, '<mark>')
+                  .replace(MARK_END, '</mark>'))
+
+
+def _result_query(sql):
+    """Text query typed so SQLite hands back datetimes, not strings"""
+    return text(sql).columns(id=Integer, title=String, date_posted=DateTime,
+                             snippet=String, rank=Float)
+
+
+def _dialect(db):
+    return db.engine.dialect.name
+
+
+def _fts5_query(query):
+    """Turn free text into a safe FTS5 expression (last term prefix-matched)"""
+    terms = re.findall(r'\w+', query)
+    if not terms:
+        return None
+    quoted = ['"%s"' % term for term in terms]
+    quoted[-1] += '*'
+    return ' '.join(quoted)
+
+
+def ensure_search_index(db):
+    """Create the search index for the current backend if it is missing"""
+    dialect = _dialect(db)
+    if dialect == 'sqlite':
+        db.session.execute(text(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+            "title, content, content='blog_post', content_rowid='id', "
+            "tokenize='porter unicode61')"
+        ))
+    elif dialect == 'postgresql':
+        db.session.execute(text(
+            "ALTER TABLE blog_post ADD COLUMN IF NOT EXISTS search_vector tsvector "
+            "GENERATED ALWAYS AS ("
+            "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+            "setweight(to_tsvector('english', coalesce(content, '')), 'B')"
+            ") STORED"
+        ))
+        db.session.execute(text(
+            f"CREATE INDEX IF NOT EXISTS {PG_INDEX} ON blog_post USING GIN (search_vector)"
+        ))
+    db.session.commit()
+
+
+def index_post(db, post):
+    """Add a newly inserted post to the index within the current transaction.
+
+    PostgreSQL maintains its generated column itself, so only SQLite needs
+    an explicit write. The post must have been flushed so it has an id.
+    """
+    if _dialect(db) == 'sqlite':
+        db.session.execute(
+            text(f"INSERT INTO {FTS_TABLE} (rowid, title, content) VALUES (:id, :title, :content)"),
+            {'id': post.id, 'title': post.title, 'content': post.content},
+        )
+
+
+def index_rows(db, rows):
+    """Index freshly inserted ``(id, title, content)`` rows in one executemany"""
+    if _dialect(db) == 'sqlite' and rows:
+        db.session.execute(
+            text(f"INSERT INTO {FTS_TABLE} (rowid, title, content) VALUES (:id, :title, :content)"),
+            [{'id': id, 'title': title, 'content': content} for id, title, content in rows],
+        )
+
+
+def rebuild_search_index(db):
+    """Rebuild the whole index from the blog_post table"""
+    ensure_search_index(db)
+    dialect = _dialect(db)
+    if dialect == 'sqlite':
+        db.session.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"))
+    elif dialect == 'postgresql':
+        db.session.execute(text(f"REINDEX INDEX {PG_INDEX}"))
+    db.session.commit()
+
+
+def search_posts(db, query, limit=20):
+    """Return up to ``limit`` SearchResults for ``query``, best match first"""
+    query = (query or '').strip()
+    if not query:
+        return []
+    dialect = _dialect(db)
+
+    if dialect == 'sqlite':
+        expression = _fts5_query(query)
+        if expression is None:
+            return []
+        # Rank and snippet in a single FTS5 pass, then fetch post metadata
+        # for the winning rows; joining before the LIMIT costs a table
+        # lookup for every match.
+        hits = db.session.execute(text(
+            f"SELECT rowid, snippet({FTS_TABLE}, 1, :start, :end, '…', {SNIPPET_WORDS}), "
+            f"bm25({FTS_TABLE}, {TITLE_WEIGHT}, 1.0) AS rank "
+            f"FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH :query "
+            "ORDER BY rank LIMIT :limit"
+        ), {'query': expression, 'start': MARK_START, 'end': MARK_END, 'limit': limit}).all()
+        if not hits:
+            return []
+        posts = {row.id: row for row in db.session.execute(
+            text("SELECT id, title, date_posted FROM blog_post WHERE id IN :ids")
+            .bindparams(bindparam('ids', expanding=True))
+            .columns(id=Integer, title=String, date_posted=DateTime),
+            {'ids': [hit[0] for hit in hits]},
+        )}
+        rows = [(post_id, posts[post_id].title, posts[post_id].date_posted, snippet, rank)
+                for post_id, snippet, rank in hits if post_id in posts]
+    elif dialect == 'postgresql':
+        # ts_headline re-parses the body, so it only runs on the ranked page
+        rows = db.session.execute(_result_query(
+            "WITH hits AS ("
+            "  SELECT id, title, date_posted, content, "
+            "         ts_rank_cd(search_vector, q) AS rank, q "
+            "  FROM blog_post, websearch_to_tsquery('english', :query) AS q "
+            "  WHERE search_vector @@ q "
+            "  ORDER BY rank DESC LIMIT :limit"
+            ") "
+            "SELECT id, title, date_posted, "
+            "       ts_headline('english', content, q, :options) AS snippet, rank "
+            "FROM hits ORDER BY rank DESC"
+        ), {
+            'query': query,
+            'limit': limit,
+            'options': f'StartSel={MARK_START}, StopSel={MARK_END}, '
+                       f'MaxWords={SNIPPET_WORDS}, MinWords=12',
+        })
+    else:
+        pattern = f"%{query}%"
+        rows = db.session.execute(_result_query(
+            "SELECT id, title, date_posted, substr(content, 1, 200) AS snippet, 0 AS rank "
+            "FROM blog_post WHERE title LIKE :pattern OR content LIKE :pattern "
+            "ORDER BY date_posted DESC LIMIT :limit"
+        ), {'pattern': pattern, 'limit': limit})
+
+    return [SearchResult(*row) for row in rows]
@@ -2,14 +2,37 @@
 """
 Portfolio Website Setup Script
 Initializes the database and optionally creates sample blog posts.
+
+Usage:
+    python setup.py             # create tables and sample posts
+    python setup.py backfill    # fill in excerpts for posts saved before they existed
+    python setup.py build-assets  # minify, fingerprint and precompress static assets
+    python setup.py rebuild-search  # rebuild the full-text search index
+    python setup.py import posts.jsonl posts/  # bulk import JSONL or Markdown posts
+    python setup.py rerender    # re-render post HTML after a renderer change
+    python setup.py freeze --output build  # export the site as static files
+    python setup.py build-feeds  # rebuild the stored /feed.xml and /sitemap.xml
+    python setup.py jobs        # background job queue depth and recent failures
+    python setup.py run-jobs    # run every due background job now
+    python setup.py sync-replicas  # copy the primary into SQLite stand-in replicas
 """
 
-from app import app, db, BlogPost
+import argparse
+import os
+
+from sqlalchemy import update
+
+from app import (app, db, BlogPost, feeds, fragment_cache, freezer, jobs, object_cache,
+                 page_cache, replicas, upgrade_schema)
+from assets import build_assets
+from search import rebuild_search_index
+from importer import DEFAULT_BATCH_SIZE, import_posts, read_posts
+from rendering import RENDERER_VERSION
 from datetime import datetime, timedelta
 
-def create_sample_posts():
-    """Create sample blog posts for demonstration"""
-    sample_posts = [
+def sample_post_data():
+    """The demonstration posts as dicts of BlogPost fields"""
+    return [
         {
             "title": "Migrating from AWS Elastic Beanstalk to Kubernetes: Lessons Learned",
             "content": """Recently, I led a major infrastructure migration project at CSG International where we moved our production workloads from AWS Elastic Beanstalk to Amazon EKS (Kubernetes). This was a complex undertaking that resulted in 75% faster deployments and zero downtime during the transition.
@@ -145,19 +168,73 @@ The success of this migration has made infrastructure management much more effic
             "date_posted": datetime.utcnow() - timedelta(days=20)
         }
     ]
-    
-    for post_data in sample_posts:
-        existing_post = BlogPost.query.filter_by(title=post_data["title"]).first()
-        if not existing_post:
-            post = BlogPost(
-                title=post_data["title"],
-                content=post_data["content"],
-                date_posted=post_data["date_posted"]
-            )
-            db.session.add(post)
-    
+
+def create_sample_posts():
+    """Create sample blog posts for demonstration"""
+    stats = import_posts(sample_post_data(), progress=None)
+    print(f"✅ Created {stats['inserted']} sample blog posts!")
+
+def backfill_post_summaries(batch_size=500):
+    """Compute excerpt, word count, reading time and date_updated for posts missing them"""
+    updated = 0
+    last_id = 0
+    while True:
+        posts = (BlogPost.query
+                 .filter(BlogPost.id > last_id, BlogPost.excerpt.is_(None))
+                 .order_by(BlogPost.id)
+                 .limit(batch_size)
+                 .all())
+        if not posts:
+            break
+        for post in posts:
+            post.update_summary()
+        db.session.commit()
+        updated += len(posts)
+        last_id = posts[-1].id
+        db.session.expunge_all()
+    # Posts that predate date_updated were last modified when they were posted
+    db.session.execute(
+        update(BlogPost)
+        .where(BlogPost.date_updated.is_(None))
+        .values(date_updated=BlogPost.date_posted)
+    )
     db.session.commit()
-    print(f"✅ Created {len(sample_posts)} sample blog posts!")
+    # The bulk update bypasses the per-post invalidation, and post cards
+    # are keyed by date_updated, which backfilled excerpts do not change
+    object_cache.clear()
+    fragment_cache.invalidate('post-card', 'home-post-card')
+    print(f"✅ Backfilled summaries for {updated} blog posts")
+    return updated
+
+def rerender_posts(force=False, batch_size=200):
+    """Re-render stored HTML for posts rendered by an older renderer version"""
+    rendered = 0
+    last_id = 0
+    while True:
+        query = BlogPost.query.filter(BlogPost.id > last_id)
+        if not force:
+            query = query.filter(db.or_(BlogPost.render_version.is_(None),
+                                        BlogPost.render_version < RENDERER_VERSION))
+        posts = query.order_by(BlogPost.id).limit(batch_size).all()
+        if not posts:
+            break
+        for post in posts:
+            post.render()
+            # Excerpts are cut from the rendered text
+            post.update_summary()
+        # Rendering alone is not a modification; keep date_updated as it is
+        db.session.commit()
+        rendered += len(posts)
+        last_id = posts[-1].id
+        db.session.expunge_all()
+        print(f"🖋  Rendered {rendered} posts")
+    if rendered:
+        # As in backfill: cards are keyed by date_updated, which stays the same
+        object_cache.clear()
+        fragment_cache.invalidate('post-card', 'home-post-card')
+        page_cache.invalidate()
+    print(f"✅ {rendered} posts rendered with renderer version {RENDERER_VERSION}")
+    return rendered
 
 def setup_database():
     """Initialize the database and create sample data"""
@@ -166,23 +243,159 @@ def setup_database():
     with app.app_context():
         # Create all tables
         db.create_all()
+        upgrade_schema()
         print("✅ Database tables created successfully!")
         
         # Create sample blog posts
         create_sample_posts()
+        backfill_post_summaries()
+        rerender_posts()
+        rebuild_search_index(db)
+        feeds.refresh(app)
         
         print("🎉 Database setup complete!")
 
-def main():
+def run_backfill(args):
+    """Upgrade the schema and backfill derived post fields"""
+    with app.app_context():
+        upgrade_schema()
+        backfill_post_summaries()
+
+def run_build_assets(args):
+    """Write minified, fingerprinted, precompressed assets and critical CSS to static/dist"""
+    manifest = build_assets(app.static_folder, template_folder=os.path.join(app.root_path, app.template_folder))
+    print(f"✅ Built {len(manifest)} assets")
+
+def run_rebuild_search(args):
+    """Rebuild the full-text search index from blog_post"""
+    with app.app_context():
+        upgrade_schema()
+        rebuild_search_index(db)
+        print(f"✅ Rebuilt search index for {BlogPost.query.count()} blog posts")
+
+def run_rerender(args):
+    """Regenerate stored post HTML"""
+    with app.app_context():
+        upgrade_schema()
+        rerender_posts(force=args.force)
+        # The feed carries the rendered HTML
+        feeds.refresh(app, rebuild=True)
+
+def run_import(args):
+    """Stream posts from JSONL files or Markdown directories into the database"""
+    with app.app_context():
+        db.create_all()
+        upgrade_schema()
+        for path in args.paths:
+            print(f"📂 Importing {path}")
+            stats = import_posts(read_posts(path), batch_size=args.batch_size)
+            print(f"✅ {stats['inserted']} imported, {stats['skipped']} duplicates skipped, "
+                  f"{stats['invalid']} invalid")
+        # Catch up here rather than in the first request after the import
+        feeds.refresh(app)
+
+def run_freeze(args):
+    """Render the site to static files"""
+    output = args.output or app.config['FREEZE_DIR'] or 'build'
+    if args.precompress:
+        app.config['FREEZE_PRECOMPRESS'] = True
+    with app.app_context():
+        upgrade_schema()
+    if args.post:
+        freezer.rebuild_published(app, args.post, output)
+        print(f"✅ Rebuilt {len(args.post)} posts, / and the listings in {output}")
+        return
+    stats = freezer.freeze(app, output)
+    print(f"✅ Froze {stats['pages']} pages, {stats['listing_pages']} listing pages and "
+          f"{stats['posts']} posts into {output} in {stats['seconds']} s "
+          f"(listings {stats['listing_seconds']} s)")
+
+def run_build_feeds(args):
+    """Write the Atom feed and sitemap from scratch"""
+    with app.app_context():
+        upgrade_schema()
+        if not feeds.refresh(app, rebuild=True):
+            raise RuntimeError("building the feed and sitemap failed, see the log")
+        state = feeds.load_state()
+        urls = sum(shard['count'] for shard in state['shards'])
+        print(f"✅ Wrote {len(state['entries'])} feed entries and {urls} sitemap URLs "
+              f"in {len(state['shards'])} shard(s) to {feeds.directory}")
+
+def run_jobs_status(args):
+    """Print the job queue and the most recent failures with their errors"""
+    with app.app_context():
+        upgrade_schema()
+        status = jobs.status()
+        print(f"📬 {status['queue_depth']} jobs due, oldest waiting "
+              f"{status['oldest_due_seconds']} s")
+        for kind, counts in sorted(status['counts'].items()):
+            print(f"   {kind}: " + ', '.join(f'{count} {state}' for state, count in sorted(counts.items())))
+        for job in status['failed']:
+            print(f"❌ #{job['id']} {job['key']} after {job['attempts']} attempts: {job['last_error']}")
+
+def run_run_jobs(args):
+    """Run due jobs in this process, e.g. with JOBS_WORKERS=0"""
+    with app.app_context():
+        upgrade_schema()
+    count = jobs.run_pending()
+    print(f"✅ Ran {count} jobs")
+
+def run_sync_replicas(args):
+    """Copy the primary database into the SQLite replicas used for local testing"""
+    with app.app_context():
+        upgrade_schema()
+        copied = replicas.sync_sqlite()
+        for key in replicas.keys:
+            state = '✅ copied' if key in copied else '⏭️  skipped (not SQLite)'
+            print(f"{state} {key}: {db.engines[key].url.render_as_string()}")
+        print(f"✅ Synced {len(copied)} of {len(replicas.keys)} replicas")
+
+def main(argv=None):
     """Main setup function"""
+    parser = argparse.ArgumentParser(description="Portfolio Website setup")
+    parser.set_defaults(command='setup', handler=lambda args: setup_database())
+    commands = parser.add_subparsers(title='commands')
+    commands.add_parser('setup', help="create tables and sample posts").set_defaults(
+        command='setup', handler=lambda args: setup_database())
+    commands.add_parser('backfill', help="fill in derived fields on existing posts").set_defaults(
+        command='backfill', handler=run_backfill)
+    commands.add_parser('build-assets', help="fingerprint and precompress static assets").set_defaults(
+        command='build-assets', handler=run_build_assets)
+    commands.add_parser('rebuild-search', help="rebuild the full-text search index").set_defaults(
+        command='rebuild-search', handler=run_rebuild_search)
+    rerender = commands.add_parser('rerender', help="re-render stored post HTML")
+    rerender.add_argument('--force', action='store_true',
+                          help="re-render every post, not only outdated ones")
+    rerender.set_defaults(command='rerender', handler=run_rerender)
+    freeze = commands.add_parser('freeze', help="export the site as static files")
+    freeze.add_argument('--output', help="target directory (default FREEZE_DIR or ./build)")
+    freeze.add_argument('--precompress', action='store_true', help="also write .gz and .br files")
+    freeze.add_argument('--post', type=int, action='append',
+                        help="only rebuild the pages affected by publishing this post id")
+    freeze.set_defaults(command='freeze', handler=run_freeze)
+    commands.add_parser('build-feeds', help="rebuild the stored feed and sitemap").set_defaults(
+        command='build-feeds', handler=run_build_feeds)
+    importer = commands.add_parser('import', help="bulk import posts from JSONL or Markdown")
+    importer.add_argument('paths', nargs='+', help="a .jsonl file or a directory of .md files")
+    importer.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+    importer.set_defaults(command='import', handler=run_import)
+    commands.add_parser('jobs', help="show the background job queue").set_defaults(
+        command='jobs', handler=run_jobs_status)
+    commands.add_parser('run-jobs', help="run due background jobs now").set_defaults(
+        command='run-jobs', handler=run_run_jobs)
+    commands.add_parser('sync-replicas', help="copy the primary into SQLite replicas").set_defaults(
+        command='sync-replicas', handler=run_sync_replicas)
+    args = parser.parse_args(argv)
+
     print("🚀 Setting up Portfolio Website...")
     print("=" * 50)
     
     try:
-        setup_database()
+        args.handler(args)
         print("\n🌟 Setup completed successfully!")
-        print("📝 Run 'python run.py' to start the website")
-        print("🌐 Visit http://localhost:5000 to see your portfolio")
+        if args.command == 'setup':
+            print("📝 Run 'python run.py' to start the website")
+            print("🌐 Visit http://localhost:5000 to see your portfolio")
     except Exception as e:
         print(f"❌ Error during setup: {e}")
         return False
@@ -42,7 +42,9 @@ def install_dependencies():
 def setup_and_run():
     """Setup the database and run the application"""
     try:
-        # Import after potential installation
+        # Import after potential installation, as a development server
+        from config import config_name
+        os.environ.setdefault('FLASK_CONFIG', config_name('development'))
         from app import app, db
         
         print("🔧 Setting up database...")
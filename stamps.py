@@ -0,0 +1,44 @@
+"""
+Cross-worker invalidation for the per-process caches
+
+Each gunicorn worker keeps its own copy of the page and fragment caches.
+A worker that invalidates entries bumps the modification time of a stamp
+file in the instance folder; the other workers compare it with the value
+they last saw, a single stat(), and clear their copies when it moved.
+"""
+
+import os
+import time
+
+
+class Stamp:
+    """A stamp file and the modification time this worker last saw"""
+
+    def __init__(self, path=None):
+        self.path = path
+        self._seen = self.read()
+
+    def read(self):
+        try:
+            return os.stat(self.path).st_mtime_ns
+        except (OSError, TypeError):
+            return None
+
+    def changed(self):
+        """True if another worker bumped the stamp since our last look"""
+        stamp = self.read()
+        if stamp == self._seen:
+            return False
+        self._seen = stamp
+        return True
+
+    def bump(self):
+        if not self.path:
+            return
+        try:
+            with open(self.path, 'a'):
+                pass
+            os.utime(self.path, ns=(time.time_ns(), time.time_ns()))
+            self._seen = self.read()
+        except OSError:
+            pass
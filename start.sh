@@ -3,15 +3,11 @@
 # Alternative startup script for different deployment scenarios
 
 PORT=${PORT:-8000}
+export PORT
 
 echo "Starting portfolio website on port $PORT..."
 
-# Try gunicorn with config file first
-if [ -f "gunicorn.conf.py" ]; then
-    echo "Using gunicorn.conf.py configuration"
-    exec gunicorn app:app -c gunicorn.conf.py
-else
-    # Fallback to basic gunicorn command
-    echo "Using basic gunicorn configuration"
-    exec gunicorn app:app --bind 0.0.0.0:$PORT --workers 1 --timeout 30
-fi
\ No newline at end of file
+# gunicorn.conf.py selects the concurrency profile from GUNICORN_PROFILE,
+# WEB_CONCURRENCY and GUNICORN_THREADS, same as the Procfile and render-start.py
+echo "Using gunicorn.conf.py configuration (profile: ${GUNICORN_PROFILE:-gthread})"
+exec gunicorn app:app -c gunicorn.conf.py